@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+import cv2
+import numpy as np
+from synthetic_video import DIRECTIONS, SyntheticTrafficScene, generate_intersection
+from stage_timer import StageTimer
+from vehicle_detector import VehicleDetector
+from vehicle_tracker import VehicleTracker
+from traffic_analyzer import TrafficAnalyzer
+from occupancy import OccupancyEstimator
+from roi import RegionOfInterest
+
+# Used when the configured car cascade is not installed (the opencv-python wheels do not ship it);
+# detection results differ but the cascade does comparable work per frame
+FALLBACK_CASCADE = 'haarcascade_frontalface_default.xml'
+
+def describe(latencies, items_per_call=1, warmup=0):
+    """Throughput and latency percentiles of a list of per-call durations (seconds)"""
+    latencies = np.asarray(latencies[warmup:] if len(latencies) > warmup else latencies, dtype=np.float64)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'calls': len(latencies),
+        'per_sec': items_per_call * len(latencies) / max(latencies.sum(), 1e-12),
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99)
+    }
+
+def resolve_cascade(cascade_file):
+    """Path of a cascade file, looking bare names up among OpenCV's bundled cascades"""
+    return cascade_file if os.path.exists(cascade_file) else cv2.data.haarcascades + cascade_file
+
+def git_commit():
+    """Short hash of the checked-out commit, if this is a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Benchmark:
+    """Measure each component and the headless pipeline on generated four-direction clips"""
+
+    def __init__(self, config_file='config.json', work_dir=None, frames=250, fps=25, width=640, height=480,
+                 vehicles=6, speed=4.0, seed=0, cascade=None, warmup=5):
+        with open(config_file, 'r') as f:
+            self.config = json.load(f)
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='traffic_bench_')
+        self.frames = frames
+        self.fps = fps
+        self.warmup = warmup
+        self.scene_options = {'width': width, 'height': height, 'vehicles': vehicles, 'speed': speed}
+        self.seed = seed
+        self.directions = list(self.config['video_sources'].keys()) or list(DIRECTIONS)
+
+        # Cascade: explicit choice, then the configured one, then a bundled stand-in
+        detection_config = self.config.setdefault('detection', {})
+        cascade_path = resolve_cascade(cascade or detection_config.get('cascade_file', 'haarcascade_car.xml'))
+        if not os.path.exists(cascade_path):
+            print(f"Cascade {cascade_path} not found, benchmarking with {FALLBACK_CASCADE} instead")
+            cascade_path = resolve_cascade(FALLBACK_CASCADE)
+        detection_config['cascade_file'] = cascade_path
+
+        # Everything the benchmark writes stays in the work directory
+        self.video_paths = generate_intersection(
+            os.path.join(self.work_dir, 'videos'), frames, fps, self.directions, seed, **self.scene_options
+        )
+        self.config['video_sources'] = self.video_paths
+        self.config['logging'].update({
+            'log_file': os.path.join(self.work_dir, 'traffic_analysis.log'),
+            'statistics_file': os.path.join(self.work_dir, 'traffic_stats.csv')
+        })
+        self.config.setdefault('profiling', {})['stats_file'] = os.path.join(self.work_dir, 'stage_stats.json')
+        self.config_file = os.path.join(self.work_dir, 'config.json')
+        with open(self.config_file, 'w') as f:
+            json.dump(self.config, f, indent=4)
+
+        # The same frames and ground-truth boxes are fed to every component
+        self.scenes = {
+            direction: SyntheticTrafficScene(seed=seed + i, **self.scene_options)
+            for i, direction in enumerate(self.directions)
+        }
+
+    def frame_sets(self):
+        """Yield ({direction: frame}, {direction: ground-truth boxes}) for every frame index"""
+        for index in range(self.frames):
+            frames = {direction: scene.frame(index) for direction, scene in self.scenes.items()}
+            boxes = {direction: scene.vehicle_boxes(index).tolist() for direction, scene in self.scenes.items()}
+            yield frames, boxes
+
+    def bench_detector(self):
+        """VehicleDetector.detect_vehicles per frame, with its stage breakdown"""
+        detectors = {direction: VehicleDetector(self.config_file, direction) for direction in self.directions}
+        timer = StageTimer(window=self.frames * len(self.directions))
+        latencies = []
+        for frames, _ in self.frame_sets():
+            for direction, frame in frames.items():
+                start = time.perf_counter()
+                detectors[direction].detect_vehicles(frame)
+                latencies.append(time.perf_counter() - start)
+                for stage, seconds in detectors[direction].stage_times.items():
+                    timer.record(stage, seconds)
+        result = describe(latencies, warmup=self.warmup * len(self.directions))
+        result['frames_skipped'] = sum(detector.frames_skipped for detector in detectors.values())
+        result['stages'] = {stage: stats['all'] for stage, stats in timer.get_summary().items()}
+        return result
+
+    def bench_tracker(self):
+        """VehicleTracker.update for all directions per frame"""
+        tracking_config = self.config.get('tracking', {})
+        trackers = {direction: VehicleTracker.from_config(tracking_config) for direction in self.directions}
+        latencies = []
+        for index, (_, boxes) in enumerate(self.frame_sets()):
+            timestamp = index / self.fps
+            start = time.perf_counter()
+            for direction, tracker in trackers.items():
+                tracker.update(boxes[direction], timestamp)
+            latencies.append(time.perf_counter() - start)
+        return describe(latencies, warmup=self.warmup)
+
+    def bench_analyzer(self):
+        """One analysis tick: density for all directions, light update, status, comparison and recommendations"""
+        analyzer = TrafficAnalyzer(self.config_file)
+        latencies = []
+        for frames, boxes in self.frame_sets():
+            start = time.perf_counter()
+            for direction, frame in frames.items():
+                analyzer.calculate_density(boxes[direction], direction, frame)
+            analyzer.update_traffic_light()
+            analyzer.get_traffic_status()
+            analyzer.get_timing_comparison()
+            analyzer.get_timing_recommendation()
+            latencies.append(time.perf_counter() - start)
+        return describe(latencies, warmup=self.warmup)
+
+    def bench_occupancy(self):
+        """OccupancyEstimator.estimate per frame, the detector-free alternative to bench_detector"""
+        density_config = self.config.get('density', {})
+        estimators = {direction: OccupancyEstimator.from_config(density_config) for direction in self.directions}
+        rois = {direction: RegionOfInterest.from_config(self.config, direction) for direction in self.directions}
+        latencies = []
+        for frames, _ in self.frame_sets():
+            for direction, frame in frames.items():
+                start = time.perf_counter()
+                estimators[direction].estimate(frame, rois[direction])
+                latencies.append(time.perf_counter() - start)
+        return describe(latencies, warmup=self.warmup * len(self.directions))
+
+    def display_size(self):
+        window_size = self.config['display']['window_size']
+        return (window_size['width'] // 3, window_size['height'] // 3)
+
+    def bench_overlay(self):
+        """VehicleDetector.draw_detections at the GUI tile size for all directions"""
+        detector = VehicleDetector(self.config_file)
+        display_size = self.display_size()
+        latencies = []
+        for frames, boxes in self.frame_sets():
+            start = time.perf_counter()
+            for direction, frame in frames.items():
+                detector.draw_detections(frame, boxes[direction], display_size)
+            latencies.append(time.perf_counter() - start)
+        return describe(latencies, warmup=self.warmup)
+
+    def bench_gui(self):
+        """TrafficControlGUI.update_frame with all tiles; needs a display"""
+        try:
+            from gui import TrafficControlGUI
+            gui = TrafficControlGUI(self.config_file)
+        except Exception as e:  # No display (TclError) or no Tk at all
+            return {'skipped': f"GUI not available: {e}"}
+
+        detector = VehicleDetector(self.config_file)
+        display_size = self.display_size()
+        latencies = []
+        try:
+            for frames, boxes in self.frame_sets():
+                tiles = {
+                    direction: detector.draw_detections(frame, boxes[direction], display_size)
+                    for direction, frame in frames.items()
+                }
+                start = time.perf_counter()
+                gui.update_frame(tiles)
+                gui.root.update_idletasks()
+                latencies.append(time.perf_counter() - start)
+        finally:
+            gui.root.destroy()
+        result = describe(latencies, warmup=self.warmup)
+        result['tile_encoding'] = gui.tile_encoding
+        return result
+
+    def bench_pipeline(self):
+        """Whole headless pipeline (decode, detect, track, analyze, log) on the generated clips"""
+        from main import TrafficControlApp
+        app = TrafficControlApp(self.config_file, headless=True)
+        summary = app.run_headless()
+        if summary is None:
+            return {'skipped': "Could not open the generated videos"}
+        return summary
+
+    COMPONENTS = ('detector', 'occupancy', 'tracker', 'analyzer', 'overlay', 'gui', 'pipeline')
+
+    def run(self, components=COMPONENTS):
+        """Run the selected benchmarks and return the results with environment details"""
+        results = {}
+        for component in components:
+            start = time.perf_counter()
+            results[component] = getattr(self, f'bench_{component}')()
+            results[component]['wall_time'] = time.perf_counter() - start
+        return {
+            'meta': {
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'opencv': cv2.__version__,
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'frames': self.frames,
+                'fps': self.fps,
+                'directions': self.directions,
+                'scene': self.scene_options,
+                'seed': self.seed,
+                'cascade': self.config['detection']['cascade_file'],
+                'processing': self.config.get('processing', {}),
+                'detection': {key: value for key, value in self.config['detection'].items() if key != 'roi'}
+            },
+            'results': results
+        }
+
+def print_results(report):
+    """Short table of the benchmark results"""
+    for component, result in report['results'].items():
+        if 'skipped' in result:
+            print(f"{component:10s} skipped: {result['skipped']}")
+        elif component == 'pipeline':
+            print(f"{component:10s} {result['fps']:8.1f} ticks/sec, {result['realtime_factor']:.2f}x real time, "
+                  f"latency p95 {result['latency_p95_ms']:.1f} ms")
+        else:
+            print(f"{component:10s} {result['per_sec']:8.1f} calls/sec, p50 {result['p50_ms']:.2f} ms, "
+                  f"p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the traffic analysis components on synthetic video")
+    parser.add_argument('--config', default='config.json', help="Configuration to benchmark")
+    parser.add_argument('--out', default='benchmark_results.json', help="JSON results file")
+    parser.add_argument('--components', nargs='+', choices=Benchmark.COMPONENTS, default=list(Benchmark.COMPONENTS))
+    parser.add_argument('--work-dir', help="Where to put generated videos and logs (default: a temporary directory)")
+    parser.add_argument('--frames', type=int, default=250, help="Frames per direction")
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--vehicles', type=int, default=6, help="Vehicles per direction")
+    parser.add_argument('--speed', type=float, default=4.0, help="Vehicle speed in pixels per frame")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cascade', help="Cascade file to use instead of detection.cascade_file")
+    parser.add_argument('--warmup', type=int, default=5, help="Leading calls left out of the statistics")
+    args = parser.parse_args()
+
+    benchmark = Benchmark(
+        args.config, args.work_dir, args.frames, args.fps, args.width, args.height,
+        args.vehicles, args.speed, args.seed, args.cascade, args.warmup
+    )
+    report = benchmark.run(args.components)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print_results(report)
+    print(f"Results written to {args.out}")
@@ -0,0 +1,49 @@
+import time
+from datetime import datetime
+
+class WallClock:
+    """Real time, for live cameras"""
+
+    def now(self):
+        """Current time in seconds since the epoch"""
+        return time.time()
+
+    def datetime(self):
+        return datetime.fromtimestamp(self.now())
+
+    def advance(self, position_seconds):
+        """Wall time does not follow the video"""
+
+class VideoClock:
+    """Time driven by video timestamps, so recordings can be replayed faster (or slower) than real time.
+
+    now() is start_time plus the video time played so far. A jump back in the video
+    position (a replayed loop) counts as one frame, so the clock never runs backwards.
+    """
+
+    def __init__(self, start_time=None, frame_interval=0.04):
+        self.start_time = time.time() if start_time is None else start_time
+        self.frame_interval = frame_interval
+        self.last_position = None
+        self.elapsed = 0.0
+
+    @classmethod
+    def from_config(cls, clock_config, fps=25.0):
+        """Create a video clock from the clock section of config.json"""
+        video_start = clock_config.get('video_start')
+        start_time = datetime.fromisoformat(video_start).timestamp() if video_start else None
+        return cls(start_time, 1.0 / (fps or 25.0))
+
+    def advance(self, position_seconds):
+        """Move the clock to the timestamp (seconds into the video) of the frame just read"""
+        if self.last_position is not None:
+            delta = position_seconds - self.last_position
+            self.elapsed += delta if delta >= 0 else self.frame_interval
+        self.last_position = position_seconds
+
+    def now(self):
+        """Current video time in seconds since the epoch"""
+        return self.start_time + self.elapsed
+
+    def datetime(self):
+        return datetime.fromtimestamp(self.now())
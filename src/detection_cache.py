@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class VideoDetections:
+    """Cached detections of one video for one detector fingerprint.
+
+    Stored as two .npy files read through memory maps: boxes (total boxes, 4) int32 and
+    index (frames, 2) int64 holding each frame's first box and box count (-1 when the
+    frame was never detected). New detections are kept in memory until save().
+    """
+
+    def __init__(self, base_path):
+        self.boxes_path = base_path + '.boxes.npy'
+        self.index_path = base_path + '.index.npy'
+        self.boxes = np.zeros((0, 4), dtype=np.int32)
+        self.index = np.zeros((0, 2), dtype=np.int64)
+        self.new = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.boxes_path) and os.path.exists(self.index_path)):
+            return
+        try:
+            boxes = np.load(self.boxes_path, mmap_mode='r')
+            index = np.load(self.index_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return  # Unreadable cache files are rebuilt on the next save
+        known = index[:, 1] >= 0
+        if len(index) and known.any() and (index[known, 0] + index[known, 1]).max() > len(boxes):
+            return  # Index written against a different boxes file
+        self.boxes, self.index = boxes, index
+
+    def get(self, frame_index):
+        """Cached (x, y, w, h) boxes of a frame, or None if it was never detected"""
+        vehicles = self.new.get(frame_index)
+        if vehicles is None and 0 <= frame_index < len(self.index) and self.index[frame_index, 1] >= 0:
+            start, count = self.index[frame_index]
+            vehicles = [tuple(box) for box in self.boxes[start:start + count].tolist()]
+        if vehicles is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vehicles
+
+    def put(self, frame_index, vehicles):
+        """Remember the detections of a frame"""
+        if frame_index >= 0:
+            self.new[frame_index] = list(vehicles)
+
+    def save(self):
+        """Merge new detections into the cache files"""
+        if not self.new:
+            return
+        n_frames = max(len(self.index), max(self.new) + 1)
+        counts = np.full(n_frames, -1, dtype=np.int64)
+        counts[:len(self.index)] = self.index[:, 1]
+        new_frames = np.array(sorted(self.new), dtype=np.int64)
+        counts[new_frames] = [len(self.new[i]) for i in new_frames]
+
+        # Boxes stay in frame order: copy the kept old frames' ranges, then place the new frames
+        starts = np.zeros(n_frames, dtype=np.int64)
+        starts[1:] = np.cumsum(np.maximum(counts, 0))[:-1]
+        boxes = np.empty((int(np.maximum(counts, 0).sum()), 4), dtype=np.int32)
+        kept = np.nonzero(self.index[:, 1] > 0)[0]
+        kept = kept[~np.isin(kept, new_frames)]
+        if len(kept):
+            lengths = self.index[kept, 1]
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            boxes[np.repeat(starts[kept], lengths) + offsets] = self.boxes[np.repeat(self.index[kept, 0], lengths) + offsets]
+        for i in new_frames:
+            if self.new[i]:
+                boxes[starts[i]:starts[i] + counts[i]] = np.asarray(self.new[i], dtype=np.int32).reshape(-1, 4)
+        index = np.column_stack([starts, counts])
+
+        # Drop the memory maps before replacing their files (required on Windows)
+        self.boxes, self.index, self.new = boxes, index, {}
+
+        # Write both files before replacing either, so an interrupted save keeps the previous cache
+        temporaries = []
+        for path, array in ((self.boxes_path, boxes), (self.index_path, index)):
+            temporaries.append((path + '.tmp.npy', path))
+            np.save(temporaries[-1][0], array)
+        for temporary, path in temporaries:
+            os.replace(temporary, path)
+        self._load()
+
+class DetectionCache:
+    """On-disk detections keyed by video file hash, frame index and detector fingerprint"""
+
+    def __init__(self, cache_dir='detection_cache'):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.lock = threading.Lock()
+
+        # Hashing a long recording takes a while; hashes are remembered by path, size and mtime
+        self.hashes_file = os.path.join(cache_dir, 'file_hashes.json')
+        self.hashes = {}
+        if os.path.exists(self.hashes_file):
+            with open(self.hashes_file, 'r') as f:
+                self.hashes = json.load(f)
+
+    def video_hash(self, video_path):
+        """Content hash of a video, reusing the stored one while the file is unchanged"""
+        path = os.path.abspath(video_path)
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.hashes.get(path)
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                return entry['sha1']
+        digest = hash_file(path)
+        with self.lock:
+            self.hashes[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest}
+            temporary = self.hashes_file + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(self.hashes, f, indent=2)
+            os.replace(temporary, self.hashes_file)
+        return digest
+
+    def open(self, video_path, fingerprint):
+        """Cached detections of a video for a detector fingerprint"""
+        base_name = f"{self.video_hash(video_path)[:16]}_{fingerprint[:16]}"
+        return VideoDetections(os.path.join(self.cache_dir, base_name))
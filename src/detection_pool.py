@@ -0,0 +1,321 @@
+import json
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from vehicle_detector import VehicleDetector
+from detector_backends import BACKENDS
+
+# Detectors owned by a worker process, one per direction routed to that process
+_worker_detectors = {}
+
+def _detect_in_worker(config_file, direction, frame):
+    """Run detection inside a worker process and return vehicles with the time spent (total and per stage)"""
+    detector = _worker_detectors.get(direction)
+    if detector is None:
+        detector = VehicleDetector(config_file, direction)
+        _worker_detectors[direction] = detector
+    start = time.perf_counter()
+    vehicles = detector.detect_vehicles(frame)
+    return vehicles, time.perf_counter() - start, detector.last_detection_skipped, detector.stage_times
+
+def _detect_batch(detectors, frames):
+    """Run a batched backend once for all given frames; returns the same per-direction results as _detect_local"""
+    start = time.perf_counter()
+    prepared = {direction: detectors[direction].prepare(frame) for direction, frame in frames.items()}
+    ready = [direction for direction, region in prepared.items() if region is not None]
+
+    vehicles = {direction: list(detectors[direction].last_vehicles) for direction in frames}
+    if ready:
+        # One call for every direction that needs detection; its time is shared between them
+        boxes, backend_times = detectors[ready[0]].backend.detect([prepared[direction][0] for direction in ready])
+        shared_times = {stage: seconds / len(ready) for stage, seconds in backend_times.items()}
+        for direction, direction_boxes in zip(ready, boxes):
+            vehicles[direction] = detectors[direction].complete(
+                frames[direction].shape, prepared[direction], direction_boxes, shared_times
+            )
+    elapsed = (time.perf_counter() - start) / len(frames)
+    return {
+        direction: (vehicles[direction], elapsed, detectors[direction].last_detection_skipped,
+                    detectors[direction].stage_times)
+        for direction in frames
+    }
+
+def _detect_batch_in_worker(config_file, frames):
+    """Run a batched backend for all given frames inside a worker process"""
+    for direction in frames:
+        if direction not in _worker_detectors:
+            _worker_detectors[direction] = VehicleDetector(config_file, direction)
+    return _detect_batch(_worker_detectors, frames)
+
+def _observe_in_worker(config_file, direction, frame, vehicles):
+    """Feed a frame detected elsewhere to a worker process's detector"""
+    detector = _worker_detectors.get(direction)
+    if detector is None:
+        detector = _worker_detectors[direction] = VehicleDetector(config_file, direction)
+    detector.observe(frame, vehicles)
+
+class FairWorkerPool:
+    """Worker threads shared by several clients, scheduled fairly by client priority.
+
+    Uses stride scheduling: each client advances a virtual clock by 1/priority for
+    every job it runs, and the waiting client with the smallest clock goes next, so
+    a priority-2 client gets twice the share of a priority-1 client under load.
+    """
+
+    def __init__(self, num_workers):
+        self.condition = threading.Condition()
+        self.queues = {}
+        self.priorities = {}
+        self.passes = {}
+        self.stopped = False
+
+        # Per-client scheduling statistics
+        self.completed_jobs = {}
+        self.wait_times = {}
+
+        self.workers = [
+            threading.Thread(target=self._worker_loop, name=f"shared-detector-{i}", daemon=True)
+            for i in range(max(1, int(num_workers)))
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def register(self, client, priority=1):
+        """Register a client with its scheduling priority"""
+        with self.condition:
+            self.queues.setdefault(client, deque())
+            self.priorities[client] = max(float(priority), 1e-3)
+            self.passes.setdefault(client, 0.0)
+            self.completed_jobs.setdefault(client, 0)
+            self.wait_times.setdefault(client, 0.0)
+
+    def submit(self, client, fn, *args):
+        """Queue a job for a client and return a Future with its result"""
+        future = Future()
+        with self.condition:
+            if self.stopped:
+                raise RuntimeError("FairWorkerPool has been shut down")
+            client_queue = self.queues[client]
+            if not client_queue:
+                # A client returning from idle must not bank the turns it skipped
+                waiting = [self.passes[c] for c, q in self.queues.items() if q]
+                if waiting:
+                    self.passes[client] = max(self.passes[client], min(waiting))
+            client_queue.append((future, fn, args, time.perf_counter()))
+            self.condition.notify()
+        return future
+
+    def _next_job(self):
+        """Pop the next job from the waiting client with the smallest virtual clock"""
+        with self.condition:
+            while True:
+                waiting = [client for client, client_queue in self.queues.items() if client_queue]
+                if waiting:
+                    client = min(waiting, key=lambda c: self.passes[c])
+                    self.passes[client] += 1.0 / self.priorities[client]
+                    future, fn, args, queued_at = self.queues[client].popleft()
+                    self.wait_times[client] += time.perf_counter() - queued_at
+                    return client, future, fn, args
+                if self.stopped:
+                    return None
+                self.condition.wait()
+
+    def _worker_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            client, future, fn, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            with self.condition:
+                self.completed_jobs[client] += 1
+
+    def get_stats(self):
+        """Get completed jobs and average queue wait per client"""
+        with self.condition:
+            return {
+                client: {
+                    'jobs': self.completed_jobs[client],
+                    'avg_wait_ms': (self.wait_times[client] / self.completed_jobs[client] * 1000)
+                    if self.completed_jobs[client] else 0.0,
+                    'queued': len(self.queues[client]),
+                    'priority': self.priorities[client]
+                }
+                for client in self.queues
+            }
+
+    def shutdown(self):
+        """Stop the workers once queued jobs are done"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        for worker in self.workers:
+            worker.join()
+
+class DetectionPool:
+    """Run vehicle detection for all directions of the intersection concurrently"""
+
+    EXECUTION_MODES = ('serial', 'thread', 'process', 'shared')
+
+    def __init__(self, directions, execution_mode='thread', max_workers=None, config_file='config.json',
+                 shared_pool=None, client=None, priority=1, timer=None):
+        if execution_mode not in self.EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
+
+        self.directions = list(directions)
+        self.config_file = config_file
+        self.execution_mode = execution_mode
+        self.max_workers = max(1, min(max_workers or len(self.directions), len(self.directions)))
+
+        # Batched backends (DNN) detect all directions in one call instead of one job per direction
+        with open(config_file, 'r') as f:
+            detection_config = json.load(f).get('detection', {})
+        self.batched = BACKENDS[detection_config.get('backend', 'cascade')].batched
+        self.motion_gate = detection_config.get('motion_gate', {}).get('enabled', False)
+
+        self.detectors = {}
+        self.thread_executor = None
+        self.process_executors = []
+        self.direction_executor = {}
+        self.shared_pool = None
+        self.client = client
+        
+        # Optional StageTimer receiving per-direction detection stage timings
+        self.timer = timer
+
+        if execution_mode == 'process':
+            # Each direction is pinned to one single-worker process so that its
+            # detector (and any state it keeps between frames) lives in one place. Workers are
+            # spawned, not forked: by the time they start, decoder and logging threads may hold
+            # locks that a forked child would inherit locked
+            spawn_context = multiprocessing.get_context('spawn')
+            self.process_executors = [
+                ProcessPoolExecutor(max_workers=1, mp_context=spawn_context) for _ in range(self.max_workers)
+            ]
+            for i, direction in enumerate(self.directions):
+                self.direction_executor[direction] = self.process_executors[i % self.max_workers]
+        else:
+            # Threads share memory, so keep one detector per direction in this process
+            self.detectors = {direction: VehicleDetector(config_file, direction) for direction in self.directions}
+            if execution_mode == 'shared':
+                # Workers belong to a FairWorkerPool serving several intersections
+                if shared_pool is None:
+                    raise ValueError("Shared execution mode needs a shared_pool")
+                self.shared_pool = shared_pool
+                self.shared_pool.register(client, priority)
+            elif execution_mode == 'thread':
+                self.thread_executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='detector'
+                )
+
+        # Per-direction throughput statistics
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset throughput counters for all directions"""
+        with self.stats_lock:
+            self.start_time = time.perf_counter()
+            self.frame_counts = {direction: 0 for direction in self.directions}
+            self.busy_times = {direction: 0.0 for direction in self.directions}
+            self.skipped_counts = {direction: 0 for direction in self.directions}
+
+    def _detect_local(self, direction, frame):
+        """Run detection with the direction's detector in this process"""
+        detector = self.detectors[direction]
+        start = time.perf_counter()
+        vehicles = detector.detect_vehicles(frame)
+        return vehicles, time.perf_counter() - start, detector.last_detection_skipped, detector.stage_times
+
+    def observe_all(self, frames, vehicles):
+        """Show cached frames to the detectors, so their motion gates advance as if they had detected them"""
+        if self.execution_mode != 'process':
+            for direction, frame in frames.items():
+                self.detectors[direction].observe(frame, vehicles[direction])
+        elif self.motion_gate:
+            futures = [
+                (self.process_executors[0] if self.batched else self.direction_executor[direction]).submit(
+                    _observe_in_worker, self.config_file, direction, frame, vehicles[direction]
+                )
+                for direction, frame in frames.items()
+            ]
+            for future in futures:
+                future.result()
+
+    def detect_all(self, frames):
+        """Detect vehicles in all given frames and wait for every direction to finish"""
+        if self.batched:
+            if self.execution_mode == 'process':
+                results = self.process_executors[0].submit(_detect_batch_in_worker, self.config_file, frames).result()
+            elif self.execution_mode == 'shared':
+                results = self.shared_pool.submit(self.client, _detect_batch, self.detectors, frames).result()
+            else:
+                results = _detect_batch(self.detectors, frames)
+        elif self.execution_mode == 'serial':
+            results = {direction: self._detect_local(direction, frame) for direction, frame in frames.items()}
+        else:
+            if self.execution_mode == 'thread':
+                futures = {
+                    direction: self.thread_executor.submit(self._detect_local, direction, frame)
+                    for direction, frame in frames.items()
+                }
+            elif self.execution_mode == 'shared':
+                futures = {
+                    direction: self.shared_pool.submit(self.client, self._detect_local, direction, frame)
+                    for direction, frame in frames.items()
+                }
+            else:
+                futures = {
+                    direction: self.direction_executor[direction].submit(
+                        _detect_in_worker, self.config_file, direction, frame
+                    )
+                    for direction, frame in frames.items()
+                }
+            results = {direction: future.result() for direction, future in futures.items()}
+
+        vehicles = {}
+        with self.stats_lock:
+            for direction, (direction_vehicles, elapsed, skipped, stage_times) in results.items():
+                vehicles[direction] = direction_vehicles
+                self.frame_counts[direction] += 1
+                self.busy_times[direction] += elapsed
+                if skipped:
+                    self.skipped_counts[direction] += 1
+                    
+        if self.timer is not None:
+            for direction, (_, elapsed, _, stage_times) in results.items():
+                self.timer.record('detect', elapsed, direction)
+                for stage, seconds in stage_times.items():
+                    self.timer.record(stage, seconds, direction)
+
+        return vehicles
+
+    def get_stats(self):
+        """Get frames/sec, average detection latency and skipped frames for each direction"""
+        with self.stats_lock:
+            wall_time = max(time.perf_counter() - self.start_time, 1e-9)
+            stats = {}
+            for direction in self.directions:
+                frames = self.frame_counts[direction]
+                busy_time = self.busy_times[direction]
+                stats[direction] = {
+                    'frames': frames,
+                    'fps': frames / wall_time,
+                    'avg_latency_ms': (busy_time / frames * 1000) if frames else 0.0,
+                    'skipped': self.skipped_counts[direction]
+                }
+        return stats
+
+    def shutdown(self):
+        """Stop all worker threads and processes owned by this pool"""
+        if self.thread_executor is not None:
+            self.thread_executor.shutdown(wait=True)
+        for executor in self.process_executors:
+            executor.shutdown(wait=True)
@@ -0,0 +1,231 @@
+import os
+import time
+import hashlib
+import threading
+import cv2
+import numpy as np
+
+# Cascade detection settings; they are part of the fingerprint of cached detections
+CASCADE_PARAMS = {'scaleFactor': 1.1, 'minNeighbors': 5, 'minSize': (30, 30)}
+BLUR_KERNEL = (5, 5)
+CLAHE_PARAMS = {'clipLimit': 2.0, 'tileGridSize': (8, 8)}
+ASPECT_RATIO_RANGE = (0.7, 2.0)  # Common aspect ratios for vehicles
+
+# COCO classes of the usual pretrained detectors: car, motorcycle, bus, truck
+COCO_VEHICLE_CLASSES = [2, 3, 5, 7]
+
+# Models loaded by each thread, shared by all detectors running on that thread
+# (neither CascadeClassifier nor dnn.Net may be used by two threads at once)
+_thread_models = threading.local()
+
+def _thread_model(path, load):
+    models = getattr(_thread_models, 'models', None)
+    if models is None:
+        models = _thread_models.models = {}
+    model = models.get(path)
+    if model is None:
+        model = models[path] = load(path)
+    return model
+
+def get_cascade(cascade_path):
+    """Get the calling thread's CascadeClassifier for a cascade file, loading it once"""
+    return _thread_model(cascade_path, cv2.CascadeClassifier)
+
+def get_net(model_path):
+    """Get the calling thread's DNN for an ONNX file, loading it once"""
+    def load(path):
+        net = cv2.dnn.readNetFromONNX(path)
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return net
+    return _thread_model(model_path, load)
+
+def file_hash(path):
+    """SHA-1 of a model file"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def non_max_suppression(boxes, scores, groups, iou_threshold):
+    """Vectorized (Fast NMS) suppression of overlapping (x1, y1, x2, y2) boxes within each group.
+
+    A box is dropped when it overlaps any higher-scoring box of its group by more than
+    iou_threshold. Unlike greedy NMS this needs no loop, at the price of occasionally
+    also dropping a box whose suppressor was itself suppressed. Returns a keep mask.
+    """
+    order = np.argsort(-scores, kind='stable')
+    boxes, groups = boxes[order], groups[order]
+
+    top_left = np.maximum(boxes[:, None, :2], boxes[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], boxes[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    iou = intersection / np.maximum(areas[:, None] + areas[None, :] - intersection, 1e-9)
+
+    # Only higher-scoring boxes (earlier rows) of the same group can suppress a box
+    iou = np.where(np.triu(groups[:, None] == groups[None, :], k=1), iou, 0.0)
+    keep = np.empty(len(order), dtype=bool)
+    keep[order] = iou.max(axis=0, initial=0.0) <= iou_threshold
+    return keep
+
+class CascadeBackend:
+    """Haar cascade run on each image in turn"""
+
+    batched = False
+
+    def __init__(self, detection_config):
+        # A bare file name is looked up among OpenCV's bundled cascades
+        cascade_file = detection_config.get('cascade_file', 'haarcascade_car.xml')
+        self.cascade_path = cascade_file if os.path.exists(cascade_file) else cv2.data.haarcascades + cascade_file
+
+    def settings(self):
+        """Everything that decides the output, for the detection cache fingerprint"""
+        return {
+            'backend': 'cascade',
+            'cascade': file_hash(self.cascade_path),
+            'cascade_params': CASCADE_PARAMS,
+            'blur_kernel': BLUR_KERNEL,
+            'clahe': CLAHE_PARAMS,
+            'aspect_ratio_range': ASPECT_RATIO_RANGE
+        }
+
+    def detect(self, images):
+        """(x, y, w, h) boxes found in each BGR image, and the seconds spent per stage"""
+        stage_times = {'preprocess': 0.0, 'cascade': 0.0}
+        results = []
+        for image in images:
+            start = time.perf_counter()
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+            # Apply some image processing to improve detection
+            # 1. Gaussian blur to reduce noise
+            blur = cv2.GaussianBlur(gray, BLUR_KERNEL, 0)
+
+            # 2. Contrast enhancement
+            enhanced = cv2.createCLAHE(**CLAHE_PARAMS).apply(blur)
+            stage_times['preprocess'] += time.perf_counter() - start
+            start = time.perf_counter()
+
+            vehicles = get_cascade(self.cascade_path).detectMultiScale(
+                enhanced, **CASCADE_PARAMS, flags=cv2.CASCADE_SCALE_IMAGE
+            )
+
+            # Filter out false positives based on size constraints
+            boxes = np.asarray(vehicles, dtype=np.float64).reshape(-1, 4)
+            aspect_ratios = boxes[:, 2] / boxes[:, 3]
+            results.append(boxes[(aspect_ratios >= ASPECT_RATIO_RANGE[0]) & (aspect_ratios <= ASPECT_RATIO_RANGE[1])])
+            stage_times['cascade'] += time.perf_counter() - start
+        return results, stage_times
+
+class DnnBackend:
+    """YOLO-style ONNX detector run through OpenCV DNN, with every image in one forward pass.
+
+    The model takes a (batch, 3, height, width) RGB blob scaled to 0..1 and outputs one row per
+    candidate: box center, size, an objectness score for YOLOv5-style models, then class scores.
+    Export it with a dynamic batch size (or one equal to the number of directions) so the whole
+    intersection fits in one call; models with a fixed batch of 1 are run once per image.
+    """
+
+    batched = True
+
+    def __init__(self, detection_config):
+        dnn_config = detection_config.get('dnn', {})
+        self.model_path = dnn_config.get('model', 'models/vehicles.onnx')
+        self.input_width, self.input_height = dnn_config.get('input_size', [640, 640])
+        self.score_threshold = dnn_config.get('score_threshold', 0.4)
+        self.nms_threshold = dnn_config.get('nms_threshold', 0.45)
+        self.classes = dnn_config.get('classes', COCO_VEHICLE_CLASSES)
+        self.objectness = dnn_config.get('objectness', False)
+        self.max_candidates = dnn_config.get('max_candidates', 1000)
+        self.batch_forward = True
+
+    def settings(self):
+        """Everything that decides the output, for the detection cache fingerprint"""
+        return {
+            'backend': 'dnn',
+            'model': file_hash(self.model_path),
+            'input_size': [self.input_width, self.input_height],
+            'score_threshold': self.score_threshold,
+            'nms_threshold': self.nms_threshold,
+            'classes': self.classes,
+            'objectness': self.objectness
+        }
+
+    def letterbox(self, image):
+        """Scale an image into the top-left of a gray network input, keeping its aspect ratio"""
+        height, width = image.shape[:2]
+        scale = min(self.input_width / width, self.input_height / height)
+        resized = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                             interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        canvas = np.full((self.input_height, self.input_width, 3), 114, dtype=np.uint8)
+        canvas[:resized.shape[0], :resized.shape[1]] = resized
+        return canvas, scale
+
+    def forward(self, blob):
+        """Run the network on a blob, one image at a time if it only accepts a batch of one"""
+        net = get_net(self.model_path)
+        if self.batch_forward or len(blob) == 1:
+            try:
+                net.setInput(blob)
+                return net.forward()
+            except cv2.error:
+                if len(blob) == 1:
+                    raise
+                self.batch_forward = False
+        outputs = []
+        for image in blob:
+            net.setInput(image[None])
+            outputs.append(net.forward())
+        return np.concatenate(outputs)
+
+    def detect(self, images):
+        """(x, y, w, h) boxes found in each BGR image, and the seconds spent per stage"""
+        start = time.perf_counter()
+        letterboxed = [self.letterbox(image) for image in images]
+        blob = cv2.dnn.blobFromImages([canvas for canvas, _ in letterboxed], 1 / 255.0, swapRB=True)
+        scales = np.array([scale for _, scale in letterboxed])
+        stage_times = {'preprocess': time.perf_counter() - start}
+        start = time.perf_counter()
+
+        outputs = self.forward(blob)
+        stage_times['inference'] = time.perf_counter() - start
+        start = time.perf_counter()
+
+        boxes = self.decode(outputs.reshape(len(images), *outputs.shape[-2:]), scales)
+        stage_times['nms'] = time.perf_counter() - start
+        return boxes, stage_times
+
+    def decode(self, outputs, scales):
+        """Score-threshold and suppress the candidates of a whole batch at once, then split it per image"""
+        # YOLOv8-style outputs are (batch, values, candidates); make candidates the rows
+        # (a model always proposes far more candidates than it has values per candidate)
+        if outputs.shape[1] < outputs.shape[2]:
+            outputs = outputs.transpose(0, 2, 1)
+        class_offset = 5 if self.objectness else 4
+        scores = outputs[:, :, class_offset:][:, :, self.classes].max(axis=2)
+        if self.objectness:
+            scores = scores * outputs[:, :, 4]
+
+        images, rows = np.nonzero(scores > self.score_threshold)
+        candidate_scores = scores[images, rows]
+        if len(candidate_scores) > self.max_candidates:
+            best = np.argpartition(-candidate_scores, self.max_candidates)[:self.max_candidates]
+            images, rows, candidate_scores = images[best], rows[best], candidate_scores[best]
+
+        # Center/size in network pixels to corners in image pixels
+        centers = outputs[images, rows, :2]
+        sizes = outputs[images, rows, 2:4]
+        corners = np.hstack([centers - sizes / 2, centers + sizes / 2]) / scales[images, None]
+        keep = non_max_suppression(corners, candidate_scores, images, self.nms_threshold)
+
+        corners, images = corners[keep], images[keep]
+        boxes = np.hstack([corners[:, :2], corners[:, 2:] - corners[:, :2]])
+        return [boxes[images == i] for i in range(len(outputs))]
+
+BACKENDS = {'cascade': CascadeBackend, 'dnn': DnnBackend}
+
+def create_backend(detection_config):
+    """Detection backend selected by detection.backend"""
+    name = detection_config.get('backend', 'cascade')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detection backend: {name}")
+    return BACKENDS[name](detection_config)
@@ -0,0 +1,130 @@
+import threading
+from collections import deque
+import cv2
+
+class PrefetchingCapture:
+    """Decode a cv2.VideoCapture on a background thread into a bounded ring buffer"""
+
+    DROP_POLICIES = ('block', 'drop_oldest')
+
+    def __init__(self, capture, buffer_size=8, drop_policy='block', name=None):
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+
+        self.capture = capture
+        self.buffer_size = max(1, int(buffer_size))
+        self.drop_policy = drop_policy
+        self.name = name
+
+        # Ring buffer of (frame, frame_index, pos_msec) filled by the decoder thread
+        self.buffer = deque()
+        self.condition = threading.Condition()
+        self.capture_lock = threading.Lock()
+        self.generation = 0
+        self.finished = False
+        self.stopped = False
+
+        # Counters
+        self.decoded_frames = 0
+        self.dropped_frames = 0
+        self.late_frames = 0
+
+        # Position of the frame most recently returned by read()
+        self.last_frame_index = -1
+        self.last_pos_msec = 0.0
+
+        self.thread = threading.Thread(
+            target=self._decode_loop, name=f"decoder-{name}" if name else None, daemon=True
+        )
+        self.thread.start()
+
+    def _decode_loop(self):
+        """Read frames from the capture until it ends or the decoder is released"""
+        while not self.stopped:
+            with self.capture_lock:
+                generation = self.generation
+                frame_index = int(self.capture.get(cv2.CAP_PROP_POS_FRAMES))
+                ret, frame = self.capture.read()
+                pos_msec = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+
+            with self.condition:
+                if generation != self.generation:
+                    # The capture was repositioned while this frame was decoded
+                    continue
+
+                if not ret:
+                    # End of stream: wait until the capture is rewound or released
+                    self.finished = True
+                    self.condition.notify_all()
+                    while self.finished and not self.stopped:
+                        self.condition.wait()
+                    continue
+
+                self.decoded_frames += 1
+                if len(self.buffer) >= self.buffer_size:
+                    if self.drop_policy == 'drop_oldest':
+                        self.buffer.popleft()
+                        self.dropped_frames += 1
+                    else:
+                        while (len(self.buffer) >= self.buffer_size and not self.stopped
+                               and generation == self.generation):
+                            self.condition.wait()
+                        if generation != self.generation:
+                            continue
+
+                self.buffer.append((frame, frame_index, pos_msec))
+                self.condition.notify_all()
+
+    def read(self):
+        """Return the next decoded frame, waiting only if none is ready yet"""
+        with self.condition:
+            if not self.buffer and not self.finished and not self.stopped:
+                # The consumer caught up with the decoder
+                self.late_frames += 1
+                while not self.buffer and not self.finished and not self.stopped:
+                    self.condition.wait()
+
+            if not self.buffer:
+                return False, None
+
+            frame, self.last_frame_index, self.last_pos_msec = self.buffer.popleft()
+            self.condition.notify_all()
+            return True, frame
+
+    def set(self, prop_id, value):
+        """Set a capture property, discarding frames decoded before the change"""
+        with self.capture_lock:
+            result = self.capture.set(prop_id, value)
+            with self.condition:
+                self.generation += 1
+                self.buffer.clear()
+                self.finished = False
+                self.condition.notify_all()
+        return result
+
+    def get(self, prop_id):
+        """Get a capture property"""
+        with self.capture_lock:
+            return self.capture.get(prop_id)
+
+    def isOpened(self):
+        """Check whether the underlying capture is open"""
+        return self.capture.isOpened()
+
+    def get_stats(self):
+        """Get decoder counters"""
+        with self.condition:
+            return {
+                'decoded': self.decoded_frames,
+                'dropped': self.dropped_frames,
+                'late': self.late_frames,
+                'buffered': len(self.buffer)
+            }
+
+    def release(self):
+        """Stop the decoder thread and release the capture"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.capture.release()
@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+import cv2
+import numpy as np
+
+class FrameStore:
+    """Every frame of a video decoded once into a raw uint8 file, read back through a memory map.
+
+    The pages of the file are shared by every process that opens the same store, and
+    replaying the video again is only a matter of slicing the array.
+    """
+
+    def __init__(self, base_path):
+        with open(base_path + '.json', 'r') as f:
+            self.meta = json.load(f)
+        self.fps = self.meta['fps']
+        shape = (self.meta['frames'], self.meta['height'], self.meta['width'], 3)
+        if shape[0]:
+            self.frames = np.memmap(base_path + '.frames', dtype=np.uint8, mode='r', shape=shape)
+        else:
+            self.frames = np.zeros(shape, dtype=np.uint8)  # Empty files cannot be memory-mapped
+        self.positions = np.load(base_path + '.positions.npy')
+
+    def __len__(self):
+        return len(self.frames)
+
+    @staticmethod
+    def base_path(video_path, directory, width=None):
+        """Store location for a video at a given width; a changed file gets a new store"""
+        path = os.path.abspath(video_path)
+        stat = os.stat(path)
+        key = hashlib.sha1(f"{path}:{stat.st_size}:{stat.st_mtime_ns}:{width}".encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(directory, f"{name}_{key}")
+
+    @classmethod
+    def open_or_build(cls, video_path, directory='frame_store', width=None):
+        """Open the store of a video, decoding the video into it first if needed"""
+        base_path = cls.base_path(video_path, directory, width)
+        if not os.path.exists(base_path + '.json'):
+            cls.build(video_path, base_path, width)
+        return cls(base_path)
+
+    @staticmethod
+    def build(video_path, base_path, width=None):
+        """Decode a video into base_path.frames (raw BGR frames), .positions.npy and .json"""
+        os.makedirs(os.path.dirname(base_path) or '.', exist_ok=True)
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            raise IOError(f"Could not open {video_path}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+
+        positions = []
+        size = None
+        temporary = base_path + '.frames.tmp'
+        try:
+            with open(temporary, 'wb') as f:
+                while True:
+                    ret, frame = capture.read()
+                    if not ret:
+                        break
+                    if width and frame.shape[1] > width:
+                        height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+                        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                    if size is None:
+                        size = frame.shape[:2]
+                    positions.append(capture.get(cv2.CAP_PROP_POS_MSEC))
+                    f.write(np.ascontiguousarray(frame).tobytes())
+        finally:
+            capture.release()
+
+        # The description is written last: a store without it is incomplete and gets rebuilt
+        height, frame_width = size or (0, 0)
+        os.replace(temporary, base_path + '.frames')
+        np.save(base_path + '.positions.npy', np.asarray(positions, dtype=np.float64))
+        meta = {'source': os.path.abspath(video_path), 'frames': len(positions), 'height': height,
+                'width': frame_width, 'fps': fps}
+        with open(base_path + '.json.tmp', 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(base_path + '.json.tmp', base_path + '.json')
+
+class MemmapCapture:
+    """cv2.VideoCapture-like reader over a FrameStore; read() returns read-only views, not copies"""
+
+    def __init__(self, store):
+        self.store = store
+        self.position = 0
+
+        # Position of the frame most recently returned by read()
+        self.last_frame_index = -1
+        self.last_pos_msec = 0.0
+
+    def read(self):
+        if self.store is None or self.position >= len(self.store):
+            return False, None
+        frame = self.store.frames[self.position]
+        self.last_frame_index = self.position
+        self.last_pos_msec = float(self.store.positions[self.position])
+        self.position += 1
+        return True, frame
+
+    def set(self, prop_id, value):
+        """Seek by frame number or timestamp; costs nothing since every frame is already decoded"""
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            self.position = int(min(max(value, 0), len(self.store)))
+        elif prop_id == cv2.CAP_PROP_POS_MSEC:
+            self.position = int(np.searchsorted(self.store.positions, value))
+        else:
+            return False
+        return True
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            return self.last_pos_msec
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.store.fps)
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.store))
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.store.meta['width'])
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.store.meta['height'])
+        return 0.0
+
+    def isOpened(self):
+        return self.store is not None
+
+    def release(self):
+        self.store = None
@@ -4,7 +4,14 @@ import cv2
 import json
 import threading
 import queue
+import time
 import numpy as np
+from traffic_analyzer import direction_label
+
+try:
+    from PIL import Image, ImageTk
+except ImportError:
+    Image = ImageTk = None
 
 class TrafficControlGUI:
     def __init__(self, config_file='config.json'):
@@ -14,7 +21,8 @@ class TrafficControlGUI:
             
         # Initialize main window
         self.root = tk.Tk()
-        self.root.title("Phân tích và Gợi ý Thời gian Đèn giao thông - Ngã 4")
+        self.directions = list(self.config['video_sources'].keys())
+        self.root.title(f"Phân tích và Gợi ý Thời gian Đèn giao thông - Ngã {len(self.directions)}")
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         # Create frames
@@ -31,7 +39,7 @@ class TrafficControlGUI:
         self.root.columnconfigure(2, weight=1)
         self.root.rowconfigure(0, weight=1)
         
-        # Create video displays in 2x2 grid
+        # Create video displays around the intersection
         self.create_video_grid()
         
         # Create control buttons
@@ -43,27 +51,48 @@ class TrafficControlGUI:
         # Initialize variables
         self.is_running = False
         self.is_paused = False
-        self.frame_queue = queue.Queue(maxsize=10)
-        self.status_queue = queue.Queue(maxsize=10)
+        # Processing thread publishes here; the Tk main loop drains on a timer
+        self.frame_queue = queue.Queue(maxsize=2)
+        self.status_queue = queue.Queue(maxsize=2)
+        self.refresh_interval_ms = max(1, int(1000 / self.config['display'].get('refresh_rate_hz', 30)))
+        
+        # One image per video tile, updated in place ('ppm', 'pil' or legacy 'png')
+        self.tile_encoding = self.config['display'].get('tile_encoding', 'ppm')
+        if self.tile_encoding == 'pil' and ImageTk is None:
+            self.tile_encoding = 'ppm'
+        self.tile_images = {}
+        self.tile_buffers = {}
+        self.frame_update_ms = 0.0
+        
+        # Optional StageTimer set by the application
+        self.timer = None
+        
+        # The analysis panel only changes when its values do, at most panel_refresh_hz times a second
+        self.panel_interval = 1.0 / self.config['display'].get('panel_refresh_hz', 4)
+        self.last_panel_update = 0.0
+        self.panel_values = {}
+        self.displayed_recommendations = None
         
     def create_video_grid(self):
-        """Create 2x2 grid of video displays for 4 directions"""
-        # North video (top)
-        self.video_label_north = ttk.Label(self.video_frame, text="Hướng Bắc", font=('Arial', 10, 'bold'))
-        self.video_label_north.grid(row=0, column=1, padx=5, pady=5)
-        
-        # South video (bottom)
-        self.video_label_south = ttk.Label(self.video_frame, text="Hướng Nam", font=('Arial', 10, 'bold'))
-        self.video_label_south.grid(row=2, column=1, padx=5, pady=5)
-        
-        # East video (right)
-        self.video_label_east = ttk.Label(self.video_frame, text="Hướng Đông", font=('Arial', 10, 'bold'))
-        self.video_label_east.grid(row=1, column=2, padx=5, pady=5)
-        
-        # West video (left)
-        self.video_label_west = ttk.Label(self.video_frame, text="Hướng Tây", font=('Arial', 10, 'bold'))
-        self.video_label_west.grid(row=1, column=0, padx=5, pady=5)
-        
+        """Create a grid of video displays around the intersection, one per approach"""
+        # Usual approaches sit on their compass side; others fill the remaining cells
+        compass_cells = {'north': (0, 1), 'south': (2, 1), 'east': (1, 2), 'west': (1, 0)}
+        free_cells = [(0, 0), (0, 2), (2, 0), (2, 2)]
+        
+        self.video_labels = {}
+        for direction in self.directions:
+            if direction in compass_cells:
+                row, column = compass_cells[direction]
+            elif free_cells:
+                row, column = free_cells.pop(0)
+            else:
+                extra = len(self.video_labels) - 8
+                row, column = 3 + extra // 3, extra % 3
+                
+            label = ttk.Label(self.video_frame, text=f"Hướng {direction_label(direction)}", font=('Arial', 10, 'bold'))
+            label.grid(row=row, column=column, padx=5, pady=5)
+            self.video_labels[direction] = label
+            
         # Center intersection indicator
         center_label = ttk.Label(self.video_frame, text="⛔", font=('Arial', 20))
         center_label.grid(row=1, column=1, padx=5, pady=5)
@@ -77,14 +106,17 @@ class TrafficControlGUI:
         
         # Speed control
         ttk.Label(self.control_frame, text="Tốc độ phát:").grid(row=1, column=0, padx=5)
-        self.speed_scale = ttk.Scale(self.control_frame, from_=0.25, to=2.0, orient=tk.HORIZONTAL)
+        # The processing thread reads playback_speed instead of touching the Tk widget
+        self.playback_speed = 1.0
+        self.speed_scale = ttk.Scale(self.control_frame, from_=0.25, to=2.0, orient=tk.HORIZONTAL,
+                                     command=self.on_speed_change)
         self.speed_scale.set(1.0)
         self.speed_scale.grid(row=1, column=1, columnspan=2, padx=5, sticky='ew')
         
     def create_analysis_display(self):
-        """Create traffic light timing analysis display for 4-way intersection"""
+        """Create traffic light timing analysis display for every approach of the intersection"""
         # Title
-        title_label = ttk.Label(self.analysis_frame, text="PHÂN TÍCH NGÃ 4 GIAO THÔNG", 
+        title_label = ttk.Label(self.analysis_frame, text=f"PHÂN TÍCH NGÃ {len(self.directions)} GIAO THÔNG", 
                                font=('Arial', 12, 'bold'))
         title_label.grid(row=0, column=0, columnspan=2, pady=(0, 10))
         
@@ -92,203 +124,218 @@ class TrafficControlGUI:
         ttk.Label(self.analysis_frame, text="Pha đèn hiện tại:", 
                  font=('Arial', 10, 'bold')).grid(row=1, column=0, columnspan=2, pady=(10,5), sticky='w')
         
-        self.current_phase_label = tk.StringVar(value="Pha 1: Bắc-Nam")
+        first_phase = list(self.config['traffic_light']['phases'].values())[0]
+        self.current_phase_label = tk.StringVar(value=f"Pha 1: {'-'.join(direction_label(d) for d in first_phase)}")
         ttk.Label(self.analysis_frame, textvariable=self.current_phase_label, 
                  foreground='green', font=('Arial', 10, 'bold')).grid(row=2, column=0, columnspan=2, sticky='w')
         
-        # Current timing section
-        ttk.Label(self.analysis_frame, text="Thời gian đèn hiện tại:", 
-                 font=('Arial', 10, 'bold')).grid(row=3, column=0, columnspan=2, pady=(15,5), sticky='w')
-        
-        # North current timing
-        ttk.Label(self.analysis_frame, text="Hướng Bắc:").grid(row=4, column=0, sticky='w')
-        self.north_current = tk.StringVar(value="30s")
-        ttk.Label(self.analysis_frame, textvariable=self.north_current, foreground='green').grid(row=4, column=1, sticky='w')
-        
-        # South current timing
-        ttk.Label(self.analysis_frame, text="Hướng Nam:").grid(row=5, column=0, sticky='w')
-        self.south_current = tk.StringVar(value="30s")
-        ttk.Label(self.analysis_frame, textvariable=self.south_current, foreground='green').grid(row=5, column=1, sticky='w')
-        
-        # East current timing
-        ttk.Label(self.analysis_frame, text="Hướng Đông:").grid(row=6, column=0, sticky='w')
-        self.east_current = tk.StringVar(value="30s")
-        ttk.Label(self.analysis_frame, textvariable=self.east_current, foreground='green').grid(row=6, column=1, sticky='w')
-        
-        # West current timing
-        ttk.Label(self.analysis_frame, text="Hướng Tây:").grid(row=7, column=0, sticky='w')
-        self.west_current = tk.StringVar(value="30s")
-        ttk.Label(self.analysis_frame, textvariable=self.west_current, foreground='green').grid(row=7, column=1, sticky='w')
-        
-        # Suggested timing section
-        ttk.Label(self.analysis_frame, text="Thời gian đèn gợi ý:", 
-                 font=('Arial', 10, 'bold')).grid(row=8, column=0, columnspan=2, pady=(15,5), sticky='w')
-        
-        # North suggested timing
-        ttk.Label(self.analysis_frame, text="Hướng Bắc:").grid(row=9, column=0, sticky='w')
-        self.north_suggested = tk.StringVar(value="--")
-        ttk.Label(self.analysis_frame, textvariable=self.north_suggested, foreground='blue').grid(row=9, column=1, sticky='w')
-        
-        # South suggested timing
-        ttk.Label(self.analysis_frame, text="Hướng Nam:").grid(row=10, column=0, sticky='w')
-        self.south_suggested = tk.StringVar(value="--")
-        ttk.Label(self.analysis_frame, textvariable=self.south_suggested, foreground='blue').grid(row=10, column=1, sticky='w')
-        
-        # East suggested timing
-        ttk.Label(self.analysis_frame, text="Hướng Đông:").grid(row=11, column=0, sticky='w')
-        self.east_suggested = tk.StringVar(value="--")
-        ttk.Label(self.analysis_frame, textvariable=self.east_suggested, foreground='blue').grid(row=11, column=1, sticky='w')
-        
-        # West suggested timing
-        ttk.Label(self.analysis_frame, text="Hướng Tây:").grid(row=12, column=0, sticky='w')
-        self.west_suggested = tk.StringVar(value="--")
-        ttk.Label(self.analysis_frame, textvariable=self.west_suggested, foreground='blue').grid(row=12, column=1, sticky='w')
-        
-        # Traffic density section
-        ttk.Label(self.analysis_frame, text="Mật độ giao thông:", 
-                 font=('Arial', 10, 'bold')).grid(row=13, column=0, columnspan=2, pady=(15,5), sticky='w')
-        
-        # North density
-        ttk.Label(self.analysis_frame, text="Hướng Bắc:").grid(row=14, column=0, sticky='w')
-        self.north_density = tk.StringVar(value="0.000")
-        ttk.Label(self.analysis_frame, textvariable=self.north_density).grid(row=14, column=1, sticky='w')
-        
-        # South density
-        ttk.Label(self.analysis_frame, text="Hướng Nam:").grid(row=15, column=0, sticky='w')
-        self.south_density = tk.StringVar(value="0.000")
-        ttk.Label(self.analysis_frame, textvariable=self.south_density).grid(row=15, column=1, sticky='w')
-        
-        # East density
-        ttk.Label(self.analysis_frame, text="Hướng Đông:").grid(row=16, column=0, sticky='w')
-        self.east_density = tk.StringVar(value="0.000")
-        ttk.Label(self.analysis_frame, textvariable=self.east_density).grid(row=16, column=1, sticky='w')
-        
-        # West density
-        ttk.Label(self.analysis_frame, text="Hướng Tây:").grid(row=17, column=0, sticky='w')
-        self.west_density = tk.StringVar(value="0.000")
-        ttk.Label(self.analysis_frame, textvariable=self.west_density).grid(row=17, column=1, sticky='w')
-        
-        # Vehicle counts
-        ttk.Label(self.analysis_frame, text="Số lượng xe:", 
-                 font=('Arial', 10, 'bold')).grid(row=18, column=0, columnspan=2, pady=(15,5), sticky='w')
-        
-        # North vehicles
-        ttk.Label(self.analysis_frame, text="Hướng Bắc:").grid(row=19, column=0, sticky='w')
-        self.north_vehicles = tk.StringVar(value="0")
-        ttk.Label(self.analysis_frame, textvariable=self.north_vehicles).grid(row=19, column=1, sticky='w')
-        
-        # South vehicles
-        ttk.Label(self.analysis_frame, text="Hướng Nam:").grid(row=20, column=0, sticky='w')
-        self.south_vehicles = tk.StringVar(value="0")
-        ttk.Label(self.analysis_frame, textvariable=self.south_vehicles).grid(row=20, column=1, sticky='w')
-        
-        # East vehicles
-        ttk.Label(self.analysis_frame, text="Hướng Đông:").grid(row=21, column=0, sticky='w')
-        self.east_vehicles = tk.StringVar(value="0")
-        ttk.Label(self.analysis_frame, textvariable=self.east_vehicles).grid(row=21, column=1, sticky='w')
-        
-        # West vehicles
-        ttk.Label(self.analysis_frame, text="Hướng Tây:").grid(row=22, column=0, sticky='w')
-        self.west_vehicles = tk.StringVar(value="0")
-        ttk.Label(self.analysis_frame, textvariable=self.west_vehicles).grid(row=22, column=1, sticky='w')
+        # One row per approach in each section
+        row = 3
+        self.current_vars, row = self.create_direction_section("Thời gian đèn hiện tại:", row, "30s", 'green')
+        self.suggested_vars, row = self.create_direction_section("Thời gian đèn gợi ý:", row, "--", 'blue')
+        self.density_vars, row = self.create_direction_section("Mật độ giao thông:", row, "0.000")
+        self.vehicle_vars, row = self.create_direction_section("Số lượng xe:", row, "0")
         
         # Current status section
         ttk.Label(self.analysis_frame, text="Trạng thái hiện tại:", 
-                 font=('Arial', 10, 'bold')).grid(row=23, column=0, columnspan=2, pady=(15,5), sticky='w')
+                 font=('Arial', 10, 'bold')).grid(row=row, column=0, columnspan=2, pady=(15,5), sticky='w')
         
         # Time remaining
-        ttk.Label(self.analysis_frame, text="Thời gian còn lại:").grid(row=24, column=0, sticky='w')
+        ttk.Label(self.analysis_frame, text="Thời gian còn lại:").grid(row=row + 1, column=0, sticky='w')
         self.time_remaining = tk.StringVar(value="0s")
-        ttk.Label(self.analysis_frame, textvariable=self.time_remaining, foreground='red').grid(row=24, column=1, sticky='w')
+        ttk.Label(self.analysis_frame, textvariable=self.time_remaining, foreground='red').grid(row=row + 1, column=1, sticky='w')
         
         # Recommendations section
         ttk.Label(self.analysis_frame, text="Gợi ý điều chỉnh:", 
-                 font=('Arial', 10, 'bold')).grid(row=25, column=0, columnspan=2, pady=(15,5), sticky='w')
+                 font=('Arial', 10, 'bold')).grid(row=row + 2, column=0, columnspan=2, pady=(15,5), sticky='w')
         
         # Create text widget for recommendations
         self.recommendations_text = tk.Text(self.analysis_frame, height=6, width=40, wrap=tk.WORD)
-        self.recommendations_text.grid(row=26, column=0, columnspan=2, pady=(5,0), sticky='ew')
+        self.recommendations_text.grid(row=row + 3, column=0, columnspan=2, pady=(5,0), sticky='ew')
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(self.analysis_frame, orient="vertical", command=self.recommendations_text.yview)
-        scrollbar.grid(row=26, column=2, sticky='ns')
+        scrollbar.grid(row=row + 3, column=2, sticky='ns')
         self.recommendations_text.configure(yscrollcommand=scrollbar.set)
         
         # Configure grid weights for analysis frame
         self.analysis_frame.columnconfigure(1, weight=1)
         
+    def create_direction_section(self, title, row, initial_value, foreground=None):
+        """Create a titled section with one value per approach, returning its variables and the next free row"""
+        ttk.Label(self.analysis_frame, text=title, 
+                 font=('Arial', 10, 'bold')).grid(row=row, column=0, columnspan=2, pady=(15,5), sticky='w')
+        row += 1
+        
+        variables = {}
+        for direction in self.directions:
+            ttk.Label(self.analysis_frame, text=f"Hướng {direction_label(direction)}:").grid(row=row, column=0, sticky='w')
+            variables[direction] = tk.StringVar(value=initial_value)
+            value_label = ttk.Label(self.analysis_frame, textvariable=variables[direction])
+            if foreground:
+                value_label.configure(foreground=foreground)
+            value_label.grid(row=row, column=1, sticky='w')
+            row += 1
+            
+        return variables, row
+        
     def update_frame(self, frames):
-        """Update video displays for all 4 directions"""
-        # frames should be a dict with keys: 'north', 'south', 'east', 'west'
+        """Update video displays for every approach"""
+        # frames should be a dict keyed by approach name
         if not frames:
             return
             
+        start_time = time.perf_counter()
+        
         # Calculate display size for each video
         width = self.config['display']['window_size']['width'] // 3
         height = self.config['display']['window_size']['height'] // 3
         
         # Update each direction
-        for direction in ['north', 'south', 'east', 'west']:
+        for direction, label in self.video_labels.items():
             if direction in frames:
-                frame = cv2.resize(frames[direction], (width, height))
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Convert OpenCV frame to tkinter PhotoImage
-                img = tk.PhotoImage(data=cv2.imencode('.png', frame)[1].tobytes())
+                frame = frames[direction]
+                if frame.shape[1] != width or frame.shape[0] != height:
+                    frame = cv2.resize(frame, (width, height))
+                    
+                if self.tile_encoding == 'png':
+                    # Legacy path: compress to PNG and let Tk decode it again
+                    img = tk.PhotoImage(data=cv2.imencode('.png', frame)[1].tobytes())
+                    label.configure(image=img, text="")
+                    label.imgtk = img
+                    continue
+                    
+                # Convert to RGB into a buffer reused for every frame of this tile
+                rgb = self.tile_buffers.get(direction)
+                if rgb is None or rgb.shape != frame.shape:
+                    rgb = np.empty_like(frame)
+                    self.tile_buffers[direction] = rgb
+                cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
                 
-                # Update corresponding label
-                if direction == 'north':
-                    self.video_label_north.configure(image=img, text="")
-                    self.video_label_north.imgtk = img
-                elif direction == 'south':
-                    self.video_label_south.configure(image=img, text="")
-                    self.video_label_south.imgtk = img
-                elif direction == 'east':
-                    self.video_label_east.configure(image=img, text="")
-                    self.video_label_east.imgtk = img
-                elif direction == 'west':
-                    self.video_label_west.configure(image=img, text="")
-                    self.video_label_west.imgtk = img
-        
+                img = self.tile_images.get(direction)
+                if self.tile_encoding == 'pil':
+                    pil_image = Image.frombuffer('RGB', (width, height), rgb, 'raw', 'RGB', 0, 1)
+                    if img is None or (img.width(), img.height()) != (width, height):
+                        img = ImageTk.PhotoImage(pil_image)
+                    else:
+                        img.paste(pil_image)
+                else:
+                    # Uncompressed PPM: a short header followed by the raw RGB pixels
+                    ppm = f"P6 {width} {height} 255 ".encode() + rgb.tobytes()
+                    if img is None:
+                        img = tk.PhotoImage(data=ppm, format='PPM')
+                    else:
+                        img.configure(data=ppm, format='PPM')
+                        
+                if self.tile_images.get(direction) is not img:
+                    # Attach the tile image to its label once; later frames only update pixels
+                    self.tile_images[direction] = img
+                    label.configure(image=img, text="")
+                    label.imgtk = img
+                    
+        # Rolling average of the time spent per GUI frame
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.frame_update_ms = 0.9 * self.frame_update_ms + 0.1 * elapsed_ms if self.frame_update_ms else elapsed_ms
+        if self.timer is not None:
+            self.timer.record('gui_update', elapsed_ms / 1000)
+        
+    def _set_if_changed(self, variable, text):
+        """Set a StringVar only when its text differs from what is displayed, sparing Tk a redraw"""
+        key = str(variable)
+        if self.panel_values.get(key) != text:
+            variable.set(text)
+            self.panel_values[key] = text
+            
     def update_stats(self, status):
-        """Update analysis display with current status for 4 directions"""
+        """Update analysis display with current status for every approach"""
         # Update current phase
-        phase_text = f"Pha {status['current_phase'][-1]}: {'-'.join(status['current_directions'])}"
-        self.current_phase_label.set(phase_text)
+        phase_names = '-'.join(direction_label(d) for d in status['current_directions'])
+        phase_text = f"Pha {status.get('current_phase_index', 0) + 1}: {phase_names}"
+        self._set_if_changed(self.current_phase_label, phase_text)
         
         # Update current timing (all directions get same phase time)
         phase_time = status.get('current_phase_time', 30)
-        self.north_current.set(f"{phase_time}s")
-        self.south_current.set(f"{phase_time}s")
-        self.east_current.set(f"{phase_time}s")
-        self.west_current.set(f"{phase_time}s")
-        
+        for variable in self.current_vars.values():
+            self._set_if_changed(variable, f"{phase_time}s")
+            
         # Update density and vehicle counts for all directions
-        self.north_density.set(f"{status['densities']['north']:.3f}")
-        self.south_density.set(f"{status['densities']['south']:.3f}")
-        self.east_density.set(f"{status['densities']['east']:.3f}")
-        self.west_density.set(f"{status['densities']['west']:.3f}")
-        
-        self.north_vehicles.set(str(status['vehicle_counts']['north']))
-        self.south_vehicles.set(str(status['vehicle_counts']['south']))
-        self.east_vehicles.set(str(status['vehicle_counts']['east']))
-        self.west_vehicles.set(str(status['vehicle_counts']['west']))
-        
+        for direction, density in status['densities'].items():
+            if direction in self.density_vars:
+                self._set_if_changed(self.density_vars[direction], f"{density:.3f}")
+                
+        for direction, count in status['vehicle_counts'].items():
+            if direction in self.vehicle_vars:
+                self._set_if_changed(self.vehicle_vars[direction], str(count))
+                
         # Update current status
-        self.time_remaining.set(f"{int(status['time_remaining'])}s")
+        self._set_if_changed(self.time_remaining, f"{int(status['time_remaining'])}s")
         
     def update_recommendations(self, recommendations):
-        """Update recommendations display"""
+        """Update recommendations display, refilling the text widget only when they changed"""
+        if recommendations == self.displayed_recommendations:
+            return
+        self.displayed_recommendations = list(recommendations)
         self.recommendations_text.delete(1.0, tk.END)
         for rec in recommendations:
             self.recommendations_text.insert(tk.END, f"• {rec}\n")
         
     def update_suggested_timing(self, suggested_times):
-        """Update suggested timing display for all 4 directions"""
-        self.north_suggested.set(f"{suggested_times['north']}s")
-        self.south_suggested.set(f"{suggested_times['south']}s")
-        self.east_suggested.set(f"{suggested_times['east']}s")
-        self.west_suggested.set(f"{suggested_times['west']}s")
+        """Update suggested timing display for every approach"""
+        for direction, suggested_time in suggested_times.items():
+            if direction in self.suggested_vars:
+                self._set_if_changed(self.suggested_vars[direction], f"{suggested_time}s")
+        
+    def on_speed_change(self, value):
+        """Remember the playback speed chosen on the slider"""
+        self.playback_speed = float(value)
+        
+    def _put_latest(self, target_queue, item):
+        """Put an item into a bounded queue, dropping the oldest entries when it is full"""
+        while True:
+            try:
+                target_queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    target_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                    
+    def _get_latest(self, source_queue):
+        """Drain a queue and return only its newest item (or None)"""
+        item = None
+        while True:
+            try:
+                item = source_queue.get_nowait()
+            except queue.Empty:
+                return item
+                
+    def publish_frame(self, frames):
+        """Hand annotated frames to the GUI from the processing thread (never blocks)"""
+        self._put_latest(self.frame_queue, frames)
+        
+    def publish_status(self, status, suggested_times, recommendations):
+        """Hand analysis results to the GUI from the processing thread (never blocks)"""
+        self._put_latest(self.status_queue, (status, suggested_times, recommendations))
+        
+    def refresh(self):
+        """Draw the newest published frames and status, then reschedule on the Tk main loop"""
+        frames = self._get_latest(self.frame_queue)
+        if frames is not None:
+            self.update_frame(frames)
+            
+        # The panel refreshes at its own, lower rate; newer status replaces older in the queue meanwhile
+        now = time.perf_counter()
+        if now - self.last_panel_update >= self.panel_interval:
+            status_update = self._get_latest(self.status_queue)
+            if status_update is not None:
+                status, suggested_times, recommendations = status_update
+                self.update_stats(status)
+                self.update_suggested_timing(suggested_times)
+                self.update_recommendations(recommendations)
+                self.last_panel_update = now
+                
+        self.root.after(self.refresh_interval_ms, self.refresh)
         
     def start(self):
         """Start video processing"""
@@ -320,4 +367,5 @@ class TrafficControlGUI:
         
     def run(self):
         """Start the GUI"""
+        self.root.after(self.refresh_interval_ms, self.refresh)
         self.root.mainloop()
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+import argparse
+import threading
+from detection_pool import DetectionPool, FairWorkerPool
+from main import TrafficControlApp
+from occupancy import density_engine
+
+class IntersectionHost:
+    """Run many intersection pipelines in one process on a shared pool of detector workers"""
+
+    def __init__(self, host_config_file='intersections.json'):
+        # Load the list of intersections
+        with open(host_config_file, 'r') as f:
+            self.config = json.load(f)
+
+        self.loop = self.config.get('loop', False)
+        self.report_interval = self.config.get('report_interval', 10)
+        self.shared_pool = FairWorkerPool(self.config.get('detector_workers', os.cpu_count() or 4))
+
+        # Each intersection keeps its own analyzer, logger and trackers; only detector workers are shared
+        self.apps = {}
+        self.priorities = {}
+        for entry in self.config['intersections']:
+            name = entry['name']
+            config_file = entry['config']
+            priority = entry.get('priority', 1)
+
+            # Approaches on the occupancy engine never reach the shared detectors
+            with open(config_file, 'r') as f:
+                intersection_config = json.load(f)
+            directions = [
+                direction for direction in intersection_config['video_sources']
+                if density_engine(intersection_config, direction) == 'detection'
+            ]
+
+            detection_pool = DetectionPool(
+                directions, execution_mode='shared', config_file=config_file,
+                shared_pool=self.shared_pool, client=name, priority=priority
+            )
+            self.apps[name] = TrafficControlApp(config_file, headless=True, detection_pool=detection_pool)
+            self.priorities[name] = priority
+
+        self.summaries = {}
+        self.start_time = time.perf_counter()
+
+    def _run_intersection(self, name, app):
+        """Run one intersection's headless pipeline on its own thread"""
+        self.summaries[name] = app.run_headless(loop=self.loop)
+
+    def get_report(self):
+        """Aggregate throughput and per-intersection latency"""
+        wall_time = max(time.perf_counter() - self.start_time, 1e-9)
+        scheduler_stats = self.shared_pool.get_stats()
+
+        intersections = {}
+        total_frames = 0
+        for name, app in self.apps.items():
+            summary = app.get_throughput_summary()
+            summary['priority'] = self.priorities[name]
+            summary['queue_wait_ms'] = scheduler_stats.get(name, {}).get('avg_wait_ms', 0.0)
+            intersections[name] = summary
+            total_frames += summary['total_frames']
+
+        return {
+            'wall_time': wall_time,
+            'total_frames': total_frames,
+            'aggregate_fps': total_frames / wall_time,
+            'intersections': intersections
+        }
+
+    def print_report(self):
+        """Print aggregate throughput and one line per intersection"""
+        report = self.get_report()
+        print(f"[{report['wall_time']:.0f}s] {len(self.apps)} intersections, "
+              f"{report['total_frames']} frames, {report['aggregate_fps']:.1f} frames/sec aggregate")
+        for name, summary in report['intersections'].items():
+            print(f"  {name} (priority {summary['priority']}): {summary['fps']:.1f} ticks/sec, "
+                  f"{summary['realtime_factor']:.2f}x real time, "
+                  f"latency avg {summary['latency_avg_ms']:.1f} ms / p95 {summary['latency_p95_ms']:.1f} ms, "
+                  f"queue wait {summary['queue_wait_ms']:.1f} ms")
+
+    def run(self):
+        """Run all intersections until their videos end (or forever when looping)"""
+        self.start_time = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run_intersection, args=(name, app), name=f"intersection-{name}")
+            for name, app in self.apps.items()
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=self.report_interval / len(threads))
+                if any(thread.is_alive() for thread in threads):
+                    self.print_report()
+        except KeyboardInterrupt:
+            for app in self.apps.values():
+                app.is_running = False
+            for thread in threads:
+                thread.join()
+        finally:
+            self.shared_pool.shutdown()
+
+        self.print_report()
+        return self.get_report()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run several intersections in one process with shared detector workers")
+    parser.add_argument('host_config', nargs='?', default='intersections.json',
+                        help="JSON file listing the intersections (name, config, priority)")
+    args = parser.parse_args()
+
+    IntersectionHost(args.host_config).run()
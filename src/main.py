@@ -2,42 +2,108 @@ import cv2
 import time
 import json
 import os
+import argparse
+from collections import deque
+import numpy as np
 from vehicle_detector import VehicleDetector
+from detection_pool import DetectionPool
+from frame_decoder import PrefetchingCapture
+from frame_store import FrameStore, MemmapCapture
+from detection_cache import DetectionCache
+from vehicle_tracker import VehicleTracker
 from traffic_analyzer import TrafficAnalyzer
 from traffic_logger import TrafficLogger
-from gui import TrafficControlGUI
+from stage_timer import StageTimer, ProfileWindow, format_stage_summary
+from clock import WallClock, VideoClock
 
 class TrafficControlApp:
-    def __init__(self):
+    def __init__(self, config_file='config.json', headless=False, detection_pool=None):
         # Load configuration
-        with open('config.json', 'r') as f:
+        with open(config_file, 'r') as f:
             self.config = json.load(f)
             
+        # Per-stage timings of the processing loop
+        profiling_config = self.config.get('profiling', {})
+        self.timer = StageTimer(profiling_config.get('window', 1000), profiling_config.get('stage_timers', True))
+        self.stage_summary_interval = profiling_config.get('summary_interval', 60)
+        self.stage_stats_file = profiling_config.get('stats_file')
+        self.last_stage_summary_time = time.monotonic()
+        self.profile_window = None
+        
+        # Recordings are analyzed on video time, so replays can run faster than real time
+        clock_config = self.config.get('clock', {})
+        if clock_config.get('mode', 'video') == 'video':
+            self.clock = VideoClock.from_config(clock_config)
+        else:
+            self.clock = WallClock()
+            
         # Initialize components
-        self.detector = VehicleDetector()
-        self.analyzer = TrafficAnalyzer()
-        self.logger = TrafficLogger()
-        self.gui = TrafficControlGUI()
-        
-        # Initialize video captures for 4 directions
-        self.cap_north = None
-        self.cap_south = None
-        self.cap_east = None
-        self.cap_west = None
+        self.headless = headless
+        self.detector = VehicleDetector(config_file)
+        self.analyzer = TrafficAnalyzer(config_file, self.clock)
+        self.logger = TrafficLogger(config_file, self.clock)
+        self.gui = None
+        if not headless:
+            # Tk is only needed (and only imported) when the window is shown
+            from gui import TrafficControlGUI
+            self.gui = TrafficControlGUI(config_file)
+            
+        # Detect all approaches concurrently; approaches on the occupancy engine need no detector
+        self.directions = list(self.config['video_sources'].keys())
+        self.detection_directions = [
+            direction for direction in self.directions if self.analyzer.density_engines[direction] == 'detection'
+        ]
+        processing_config = self.config.get('processing', {})
+        self.detection_pool = detection_pool or DetectionPool(
+            self.detection_directions,
+            execution_mode=processing_config.get('execution_mode', 'thread'),
+            max_workers=processing_config.get('max_workers'),
+            config_file=config_file
+        )
+        self.detection_pool.timer = self.timer
+        
+        # Detections of recorded videos are kept on disk, so repeat runs skip the detector
+        cache_config = self.config.get('detection', {}).get('cache', {})
+        self.detection_cache = None
+        if cache_config.get('enabled', False):
+            self.detection_cache = DetectionCache(cache_config.get('directory', 'detection_cache'))
+            self.detectors = {direction: VehicleDetector(config_file, direction) for direction in self.detection_directions}
+        self.cached_detections = {}
+        
+        # Track vehicles between detector and analyzer
+        tracking_config = self.config.get('tracking', {})
+        self.trackers = {}
+        if tracking_config.get('enabled', False):
+            self.trackers = {direction: VehicleTracker.from_config(tracking_config) for direction in self.detection_directions}
+        self.detection_interval = max(1, tracking_config.get('detection_interval', 1)) if self.trackers else 1
+        self.frame_index = 0
+        
+        # Initialize one video capture per approach
+        self.captures = {direction: None for direction in self.directions}
         self.is_running = False
         
+        # Throughput of headless runs
+        self.video_fps = 25.0
+        self.frames_processed = 0
+        self.tick_latencies = deque(maxlen=1000)
+        self.run_start_time = time.perf_counter()
+        
         # Set up GUI callbacks
-        self.gui.process_video = self.process_video
+        if self.gui is not None:
+            self.gui.process_video = self.process_video
+            self.gui.timer = self.timer
+            
+        # Overlays are drawn directly at the GUI tile size
+        window_size = self.config['display']['window_size']
+        self.display_size = (window_size['width'] // 3, window_size['height'] // 3)
         
     def init_video_captures(self):
-        """Initialize video captures for 4 directions with error handling"""
+        """Initialize video captures for every approach with error handling"""
         try:
             # Get video paths from config
             video_paths = {
-                'north': self.config['video_sources']['north'],
-                'south': self.config['video_sources']['south'],
-                'east': self.config['video_sources']['east'],
-                'west': self.config['video_sources']['west']
+                direction: self.config['video_sources'][direction]
+                for direction in self.directions
             }
             
             # Check if video files exist
@@ -45,126 +111,411 @@ class TrafficControlApp:
                 if not os.path.exists(path):
                     print(f"Error: Video file not found for {direction}: {path}")
                     return False
-            
-            # Initialize video captures
-            self.cap_north = cv2.VideoCapture(video_paths['north'])
-            self.cap_south = cv2.VideoCapture(video_paths['south'])
-            self.cap_east = cv2.VideoCapture(video_paths['east'])
-            self.cap_west = cv2.VideoCapture(video_paths['west'])
-            
+                    
+            # Initialize video captures; with the frame store each video is decoded only once
+            decoder_config = self.config.get('decoder', {})
+            store_config = decoder_config.get('frame_store', {})
+            for direction in self.directions:
+                if store_config.get('enabled', False):
+                    store = FrameStore.open_or_build(
+                        video_paths[direction], store_config.get('directory', 'frame_store'), store_config.get('width')
+                    )
+                    self.captures[direction] = MemmapCapture(store)
+                else:
+                    self.captures[direction] = cv2.VideoCapture(video_paths[direction])
+                    
             # Check if videos opened successfully
-            captures = [self.cap_north, self.cap_south, self.cap_east, self.cap_west]
-            directions = ['north', 'south', 'east', 'west']
-            
-            for i, cap in enumerate(captures):
+            for direction, cap in self.captures.items():
                 if not cap.isOpened():
-                    print(f"Error: Could not open {directions[i]} video. The file might be corrupted.")
-                    # Release all captures
-                    for j in range(i):
-                        captures[j].release()
+                    print(f"Error: Could not open {direction} video. The file might be corrupted.")
+                    self.release_captures()
                     return False
                     
+            # Decode each stream on its own thread so reads only pull ready frames
+            if decoder_config.get('prefetch', False) and not store_config.get('enabled', False):
+                buffer_size = decoder_config.get('buffer_size', 8)
+                drop_policy = decoder_config.get('drop_policy', 'block')
+                for direction, cap in self.captures.items():
+                    self.captures[direction] = PrefetchingCapture(cap, buffer_size, drop_policy, direction)
+                    
+            self.video_fps = min(cap.get(cv2.CAP_PROP_FPS) for cap in self.captures.values()) or 25.0
+            if isinstance(self.clock, VideoClock):
+                self.clock.frame_interval = 1.0 / self.video_fps
+                
+            if self.detection_cache is not None:
+                # Frames downscaled by the frame store give different detections than the source video
+                frame_width = store_config.get('width') if store_config.get('enabled', False) else None
+                self.cached_detections = {
+                    direction: self.detection_cache.open(
+                        video_paths[direction], self.detectors[direction].fingerprint(frame_width)
+                    )
+                    for direction in self.detection_directions
+                }
             return True
             
         except Exception as e:
             print(f"Error initializing video captures: {str(e)}")
             # Release any opened captures
-            for cap in [self.cap_north, self.cap_south, self.cap_east, self.cap_west]:
-                if cap is not None:
-                    cap.release()
+            self.release_captures()
             return False
+            
+    def release_captures(self):
+        """Release all video captures"""
+        for direction, cap in self.captures.items():
+            if cap is not None:
+                cap.release()
+            self.captures[direction] = None
+            
+    def get_decoder_stats(self):
+        """Get dropped/late frame counters of prefetching decoders"""
+        return {
+            direction: cap.get_stats()
+            for direction, cap in self.captures.items()
+            if isinstance(cap, PrefetchingCapture)
+        }
+        
+    def read_frames(self):
+        """Read one frame from every direction, or None if any stream has no frame"""
+        frames = {}
+        with self.timer.time('decode'):
+            for direction, cap in self.captures.items():
+                ret, frame = cap.read()
+                if not ret:
+                    return None
+                frames[direction] = frame
+        self.clock.advance(self.stream_position())
+        return frames
+        
+    def frame_position(self, direction):
+        """Timestamp (milliseconds) and index of the frame just read from a direction"""
+        cap = self.captures[direction]
+        if isinstance(cap, (PrefetchingCapture, MemmapCapture)):
+            return cap.last_pos_msec, cap.last_frame_index
+        return cap.get(cv2.CAP_PROP_POS_MSEC), int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+        
+    def stream_position(self):
+        """Timestamp (seconds into the video) of the frame just read from the first direction"""
+        pos_msec, frame_index = self.frame_position(self.directions[0])
+        if pos_msec > 0:
+            return pos_msec / 1000
+        # Some backends do not report timestamps; fall back to the frame number
+        return max(frame_index, 0) / self.video_fps
+        
+    def detect(self, frames):
+        """Detect vehicles in all directions, taking frames detected in earlier runs from the cache"""
+        if not self.cached_detections:
+            return self.detection_pool.detect_all(frames)
+            
+        frame_indices = {direction: self.frame_position(direction)[1] for direction in frames}
+        vehicles = {}
+        for direction in frames:
+            cached = self.cached_detections[direction].get(frame_indices[direction])
+            if cached is not None:
+                vehicles[direction] = cached
+                
+        # Detectors still see cached frames, so a partly cached run makes the same decisions as an uncached one
+        if vehicles:
+            self.detection_pool.observe_all({direction: frames[direction] for direction in vehicles}, vehicles)
+            
+        missing = {direction: frame for direction, frame in frames.items() if direction not in vehicles}
+        if missing:
+            detected = self.detection_pool.detect_all(missing)
+            for direction, direction_vehicles in detected.items():
+                self.cached_detections[direction].put(frame_indices[direction], direction_vehicles)
+            vehicles.update(detected)
+        return vehicles
+        
+    def save_detection_cache(self):
+        """Write detections made in this run to the cache"""
+        for detections in self.cached_detections.values():
+            detections.save()
+            
+    def get_cache_stats(self):
+        """Cache hits and misses per direction"""
+        return {
+            direction: {'hits': detections.hits, 'misses': detections.misses}
+            for direction, detections in self.cached_detections.items()
+        }
+        
+    def analyze_frames(self, frames):
+        """Run detection and traffic analysis on one frame per direction"""
+        # Approaches on the occupancy engine get their density from the frame alone
+        vehicles = {direction: [] for direction in frames}
+        detection_frames = {direction: frames[direction] for direction in self.detection_directions if direction in frames}
+        if detection_frames and self.frame_index % self.detection_interval == 0:
+            # Detect vehicles in all directions at the same time
+            with self.timer.time('detection'):
+                vehicles.update(self.detect(detection_frames))
+                
+            # Associate detections with tracks
+            now = self.clock.now()
+            for direction, tracker in self.trackers.items():
+                with self.timer.time('track', direction):
+                    tracker.update(vehicles[direction], now)
+                    self.analyzer.update_flow(direction, tracker.unique_count, tracker.get_flow_rate(now))
+        elif detection_frames:
+            # Between detections the trackers' predictions stand in for the detector
+            with self.timer.time('track'):
+                vehicles.update({direction: self.trackers[direction].predict() for direction in detection_frames})
+        self.frame_index += 1
+        
+        # Calculate density for all directions
+        for direction, frame in frames.items():
+            with self.timer.time('density', direction):
+                self.analyzer.calculate_density(vehicles[direction], direction, frame)
+                
+        with self.timer.time('analysis'):
+            # Update traffic light status (for analysis purposes)
+            self.analyzer.update_traffic_light()
+            
+            # Get current status
+            status = self.analyzer.get_traffic_status()
+            
+            # Get timing analysis and recommendations (cached until the traffic changes)
+            timing_comparison = self.analyzer.get_timing_comparison()
+            recommendations = self.analyzer.get_timing_recommendation()
+            
+        return vehicles, status, timing_comparison, recommendations
+        
+    def log_analysis(self, status, recommendations, timing_comparison):
+        """Write periodic analysis and throughput to the log as one record"""
+        self.logger.log_tick(
+            status, recommendations, timing_comparison,
+            self.detection_pool.get_stats(), self.get_decoder_stats()
+        )
+        
+    def report_stages(self, force=False):
+        """Log the stage timing percentiles and write them to the stats file every summary interval"""
+        now = time.monotonic()
+        if not self.timer.enabled or (not force and now - self.last_stage_summary_time < self.stage_summary_interval):
+            return
+        self.last_stage_summary_time = now
+        summary = self.timer.get_summary()
+        if not summary:
+            return
+        self.logger.log_stage_timings(summary)
+        if self.stage_stats_file:
+            self.timer.write_json(self.stage_stats_file, summary)
+            
+    def start_profiling(self, duration, output_file='profile.prof'):
+        """Capture a cProfile of the processing loop for the given number of seconds"""
+        self.profile_window = ProfileWindow(duration, output_file)
+        
+    def profile_tick(self):
+        """Per-iteration housekeeping: the profiling window and the periodic stage summary"""
+        if self.profile_window is not None:
+            self.profile_window.check()
+        self.report_stages()
+        
+    def finish_profiling(self):
+        """Write the final stage summary and any unfinished profile"""
+        if self.profile_window is not None:
+            self.profile_window.stop()
+        self.report_stages(force=True)
         
     def process_video(self):
-        """Main video processing loop for 4-way intersection"""
+        """Main video processing loop for the intersection"""
         if not self.init_video_captures():
             return
             
-        last_analysis_time = time.time()
+        last_analysis_time = self.clock.now()
         analysis_interval = self.config['analysis']['analysis_interval']
         
         try:
             while self.is_running and not self.gui.is_paused:
-                # Read frames from all 4 directions
-                ret_north, frame_north = self.cap_north.read()
-                ret_south, frame_south = self.cap_south.read()
-                ret_east, frame_east = self.cap_east.read()
-                ret_west, frame_west = self.cap_west.read()
+                # Read frames from all directions
+                frames = self.read_frames()
                 
                 # Check if any frame failed to read
-                if not all([ret_north, ret_south, ret_east, ret_west]):
+                if frames is None:
                     # Reset videos to start
-                    self.cap_north.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    self.cap_south.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    self.cap_east.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    self.cap_west.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    for cap in self.captures.values():
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                     continue
-                
-                # Detect vehicles in all directions
-                vehicles_north = self.detector.detect_vehicles(frame_north)
-                vehicles_south = self.detector.detect_vehicles(frame_south)
-                vehicles_east = self.detector.detect_vehicles(frame_east)
-                vehicles_west = self.detector.detect_vehicles(frame_west)
-                
-                # Calculate density for all directions
-                self.analyzer.calculate_density(vehicles_north, 'north', frame_north)
-                self.analyzer.calculate_density(vehicles_south, 'south', frame_south)
-                self.analyzer.calculate_density(vehicles_east, 'east', frame_east)
-                self.analyzer.calculate_density(vehicles_west, 'west', frame_west)
-                
-                # Update traffic light status (for analysis purposes)
-                self.analyzer.update_traffic_light()
-                
-                # Get current status
-                status = self.analyzer.get_traffic_status()
-                
-                # Get timing analysis and recommendations
-                timing_comparison = self.analyzer.get_timing_comparison()
-                recommendations = self.analyzer.get_timing_recommendation()
+                    
+                vehicles, status, timing_comparison, recommendations = self.analyze_frames(frames)
                 
                 # Log and analyze periodically
-                current_time = time.time()
+                current_time = self.clock.now()
                 if current_time - last_analysis_time >= analysis_interval:
-                    self.logger.log_traffic_status(status)
-                    self.logger.log_recommendation(recommendations)
-                    self.logger.log_timing_analysis(timing_comparison)
+                    recommendations = self.analyzer.get_timing_recommendation(refresh=True)
+                    self.log_analysis(status, recommendations, timing_comparison)
                     last_analysis_time = current_time
-                
+                    
                 # Draw detections on all frames
-                frame_north = self.detector.draw_detections(frame_north, vehicles_north)
-                frame_south = self.detector.draw_detections(frame_south, vehicles_south)
-                frame_east = self.detector.draw_detections(frame_east, vehicles_east)
-                frame_west = self.detector.draw_detections(frame_west, vehicles_west)
-                
-                # Prepare frames dict for GUI
-                frames = {
-                    'north': frame_north,
-                    'south': frame_south,
-                    'east': frame_east,
-                    'west': frame_west
-                }
-                
-                # Update GUI with comprehensive information
-                self.gui.update_frame(frames)
-                self.gui.update_stats(status)
-                self.gui.update_suggested_timing(timing_comparison['suggested'])
-                self.gui.update_recommendations(recommendations)
+                with self.timer.time('draw'):
+                    frames = {
+                        direction: self.detector.draw_detections(frame, vehicles[direction], self.display_size)
+                        for direction, frame in frames.items()
+                    }
+                    
+                # Publish to the GUI; the Tk main loop redraws at its own rate
+                self.gui.publish_frame(frames)
+                self.gui.publish_status(status, timing_comparison['suggested'], recommendations)
+                self.profile_tick()
                 
                 # Control playback speed
-                delay = int(30 / self.gui.speed_scale.get())
+                delay = int(30 / self.gui.playback_speed)
                 time.sleep(max(1, delay) / 1000)
                 
         finally:
             # Clean up all video captures
-            for cap in [self.cap_north, self.cap_south, self.cap_east, self.cap_west]:
-                if cap is not None:
-                    cap.release()
+            self.finish_profiling()
+            self.release_captures()
+            self.save_detection_cache()
             self.logger.save_statistics()
+            self.logger.close()
+            
+    def run_headless(self, loop=False):
+        """Process the videos as fast as possible without the GUI and return throughput figures"""
+        if not self.init_video_captures():
+            return None
             
+        # With the video clock, logging intervals follow video time, since processing runs faster than real time
+        analysis_interval = self.config['analysis']['analysis_interval']
+        last_analysis_time = self.clock.now()
+        
+        self.is_running = True
+        self.detection_pool.reset_stats()
+        self.frames_processed = 0
+        self.tick_latencies = deque(maxlen=1000)
+        self.run_start_time = time.perf_counter()
+        last_tick = None
+        
+        try:
+            while self.is_running:
+                frames = self.read_frames()
+                if frames is None:
+                    if not loop:
+                        break
+                    # Replay the recordings from the start
+                    for cap in self.captures.values():
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                    
+                tick_start = time.perf_counter()
+                _, status, timing_comparison, recommendations = self.analyze_frames(frames)
+                self.tick_latencies.append(time.perf_counter() - tick_start)
+                self.frames_processed += 1
+                last_tick = (status, timing_comparison)
+                
+                current_time = self.clock.now()
+                if current_time - last_analysis_time >= analysis_interval:
+                    recommendations = self.analyzer.get_timing_recommendation(refresh=True)
+                    self.log_analysis(status, recommendations, timing_comparison)
+                    last_analysis_time = current_time
+                    last_tick = None
+                self.profile_tick()
+                
+            # Log the ticks since the last interval too, so clips shorter than analysis_interval leave statistics
+            if last_tick is not None:
+                status, timing_comparison = last_tick
+                self.log_analysis(status, self.analyzer.get_timing_recommendation(refresh=True), timing_comparison)
+                
+        finally:
+            self.finish_profiling()
+            self.release_captures()
+            self.save_detection_cache()
+            self.logger.save_statistics()
+            self.logger.close()
+            self.detection_pool.shutdown()
+            
+        return self.get_throughput_summary()
+        
+    def get_throughput_summary(self):
+        """Frames, wall-clock vs. video time and per-tick latency of the current headless run"""
+        wall_time = max(time.perf_counter() - self.run_start_time, 1e-9)
+        latencies = np.array(self.tick_latencies) * 1000 if self.tick_latencies else np.zeros(1)
+        video_time = self.frames_processed / self.video_fps
+        return {
+            'frames': self.frames_processed,
+            'total_frames': self.frames_processed * len(self.directions),
+            'wall_time': wall_time,
+            'video_time': video_time,
+            'realtime_factor': video_time / wall_time,
+            'fps': self.frames_processed / wall_time,
+            'latency_avg_ms': float(latencies.mean()),
+            'latency_p95_ms': float(np.percentile(latencies, 95)),
+            'detection': self.detection_pool.get_stats(),
+            'detection_cache': self.get_cache_stats(),
+            'logging': self.logger.get_log_stats(),
+            'stages': self.timer.get_summary()
+        }
+        
     def run(self):
         """Start the application"""
         self.is_running = True
-        self.gui.run()
+        try:
+            self.gui.run()
+        finally:
+            self.detection_pool.shutdown()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Smart traffic light timing analysis for an intersection")
+    parser.add_argument('--config', default='config.json', help="Path to the configuration file")
+    parser.add_argument('--headless', action='store_true',
+                        help="Process the videos once without the GUI, as fast as possible")
+    parser.add_argument('--input-dir',
+                        help="Directory with one video per approach, named after it, e.g. north.mp4 (overrides video_sources)")
+    parser.add_argument('--out', help="Statistics CSV file (overrides logging.statistics_file)")
+    parser.add_argument('--profile', type=float, metavar='SECONDS',
+                        help="Capture a cProfile of the processing loop for this many seconds")
+    parser.add_argument('--profile-out', default='profile.prof', help="Output file of --profile (pstats format)")
+    return parser.parse_args()
+
+def print_throughput_summary(summary):
+    """Print the throughput figures of a headless run"""
+    print(f"Processed {summary['frames']} frames per direction ({summary['total_frames']} frames total)")
+    print(f"Wall-clock time: {summary['wall_time']:.1f}s, video time: {summary['video_time']:.1f}s "
+          f"({summary['realtime_factor']:.2f}x real time)")
+    print(f"Throughput: {summary['fps']:.1f} frames/sec per direction, "
+          f"{summary['total_frames'] / summary['wall_time']:.1f} frames/sec total")
+    for direction, stats in summary['detection'].items():
+        print(f"  {direction}: {stats['fps']:.1f} frames/sec, "
+              f"{stats['avg_latency_ms']:.1f} ms/frame detection, "
+              f"{stats['skipped']} frames skipped by motion gate")
+    if summary['detection_cache']:
+        hits = sum(stats['hits'] for stats in summary['detection_cache'].values())
+        misses = sum(stats['misses'] for stats in summary['detection_cache'].values())
+        print(f"Detection cache: {hits} frames reused, {misses} frames detected")
+    if summary['stages']:
+        print(f"Stage timings p50/p95/p99 (ms): {format_stage_summary(summary['stages'])}")
+    if summary['logging']['dropped']:
+        print(f"Log records dropped (log queue full): {summary['logging']['dropped']}")
+
+def find_direction_videos(input_dir, directions):
+    """Find a video named after each direction (e.g. north.mp4) in a directory"""
+    video_paths = {}
+    for filename in sorted(os.listdir(input_dir)):
+        name = os.path.splitext(filename)[0].lower()
+        if name in directions and name not in video_paths:
+            video_paths[name] = os.path.join(input_dir, filename)
+    return video_paths
 
 if __name__ == '__main__':
-    app = TrafficControlApp()
-    app.run()
+    args = parse_args()
+    app = TrafficControlApp(args.config, headless=args.headless)
+    
+    if args.input_dir:
+        # Every direction must come from the directory; never mix in the configured videos
+        video_paths = find_direction_videos(args.input_dir, app.directions)
+        missing = [direction for direction in app.directions if direction not in video_paths]
+        if missing:
+            app.logger.close()
+            app.detection_pool.shutdown()
+            raise SystemExit(f"No video for {', '.join(missing)} in {args.input_dir} "
+                             f"(expected files named after the directions, e.g. {missing[0]}.mp4)")
+        app.config['video_sources'] = video_paths
+    if args.out:
+        app.logger.config['logging']['save_statistics'] = True
+        app.logger.config['logging']['statistics_file'] = args.out
+        app.logger.config['logging']['rotate_daily'] = False
+    if args.profile:
+        app.start_profiling(args.profile, args.profile_out)
+        
+    if args.headless:
+        summary = app.run_headless()
+        if summary is not None:
+            print_throughput_summary(summary)
+    else:
+        app.run()
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Cheap change detector that decides when a frame needs a new cascade pass"""
+
+    def __init__(self, motion_threshold=0.005, pixel_threshold=25, min_stride=1, max_stride=8,
+                 downscale_width=160):
+        self.motion_threshold = motion_threshold
+        self.pixel_threshold = pixel_threshold
+        self.min_stride = max(1, int(min_stride))
+        self.max_stride = max(self.min_stride, int(max_stride))
+        self.downscale_width = downscale_width
+
+        # Downscaled grayscale frame at the last cascade pass
+        self.reference = None
+        self.stride = self.min_stride
+        self.frames_since_detection = 0
+        self.last_motion = 0.0
+
+    @classmethod
+    def from_config(cls, gate_config, direction=None):
+        """Create a gate from the detection.motion_gate config, applying per-direction overrides"""
+        settings = {key: value for key, value in gate_config.items() if key not in ('enabled', 'directions')}
+        settings.update(gate_config.get('directions', {}).get(direction, {}))
+        return cls(**settings)
+
+    def _downscale(self, frame):
+        """Shrink the frame to a small grayscale thumbnail for differencing"""
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.downscale_width / width)
+        small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_detect(self, frame):
+        """Return True if the cascade should run on this frame"""
+        small = self._downscale(frame)
+
+        if self.reference is None or self.reference.shape != small.shape:
+            self.last_motion = 1.0
+        else:
+            # Fraction of thumbnail pixels that changed since the last cascade pass
+            changed = cv2.absdiff(small, self.reference) > self.pixel_threshold
+            self.last_motion = np.count_nonzero(changed) / changed.size
+
+        if self.last_motion >= self.motion_threshold:
+            # Scene changed: detect now and go back to the shortest stride
+            self.stride = self.min_stride
+        else:
+            self.frames_since_detection += 1
+            if self.frames_since_detection < self.stride:
+                return False
+            # Static scene: refresh detections, then back off further
+            self.stride = min(self.stride * 2, self.max_stride)
+
+        self.reference = small
+        self.frames_since_detection = 0
+        return True
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+class OverlayRenderer:
+    """Draw detection overlays with a single translucent blend per frame"""
+
+    def __init__(self, display_config=None, fill_alpha=0.2):
+        display_config = display_config or {}
+        self.show_boxes = display_config.get('show_detection_boxes', True)
+        self.show_centers = display_config.get('show_center_points', True)
+        self.fill_alpha = fill_alpha
+        self.box_color = (0, 255, 0)
+        self.center_color = (0, 0, 255)
+
+    def render(self, frame, vehicles, display_size=None):
+        """Return a display frame, optionally resized to display_size (width, height), with overlays"""
+        height, width = frame.shape[:2]
+        scale_x = scale_y = 1.0
+        if display_size is not None and (width, height) != tuple(display_size):
+            # Draw on the small display frame instead of the full-resolution source
+            display_frame = cv2.resize(frame, tuple(display_size), interpolation=cv2.INTER_AREA)
+            scale_x = display_size[0] / width
+            scale_y = display_size[1] / height
+        elif self.show_boxes or self.show_centers:
+            # Copy the frame to avoid modifying the original
+            display_frame = frame.copy()
+        else:
+            return frame
+
+        if len(vehicles) == 0 or not (self.show_boxes or self.show_centers):
+            return display_frame
+
+        boxes = np.asarray(vehicles, dtype=np.float64).reshape(-1, 4) * [scale_x, scale_y, scale_x, scale_y]
+        boxes = np.round(boxes).astype(np.int32)
+        corners = np.column_stack([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]])
+
+        if self.show_boxes:
+            self._blend_fills(display_frame, corners)
+            for x1, y1, x2, y2 in corners.tolist():
+                cv2.rectangle(display_frame, (x1, y1), (x2, y2), self.box_color, 2)
+
+        if self.show_centers:
+            centers = boxes[:, :2] + boxes[:, 2:] // 2
+            for center_x, center_y in centers.tolist():
+                cv2.circle(display_frame, (center_x, center_y), 3, self.center_color, -1)
+
+        return display_frame
+
+    def _blend_fills(self, display_frame, corners):
+        """Blend the filled boxes into the frame once, only over their union bounding box"""
+        frame_height, frame_width = display_frame.shape[:2]
+        x1 = max(0, int(corners[:, 0].min()))
+        y1 = max(0, int(corners[:, 1].min()))
+        x2 = min(frame_width, int(corners[:, 2].max()) + 1)
+        y2 = min(frame_height, int(corners[:, 3].max()) + 1)
+        if x1 >= x2 or y1 >= y2:
+            return
+
+        # One mask holding every translucent fill
+        region = display_frame[y1:y2, x1:x2]
+        mask = np.zeros(region.shape[:2], dtype=np.uint8)
+        for bx1, by1, bx2, by2 in (corners - [x1, y1, x1, y1]).tolist():
+            cv2.rectangle(mask, (bx1, by1), (bx2, by2), 255, -1)
+
+        fill = np.empty_like(region)
+        fill[:] = self.box_color
+        blended = cv2.addWeighted(fill, self.fill_alpha, region, 1 - self.fill_alpha, 0)
+        np.copyto(region, blended, where=mask[:, :, None].astype(bool))
@@ -0,0 +1,208 @@
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from traffic_analyzer import split_green_times
+from signal_optimizer import SignalPlanOptimizer, find_statistics_files, load_statistics
+
+def fixed_policy(simulator, state):
+    """The configured cycle split evenly between the phases, whatever the traffic"""
+    return np.broadcast_to(simulator.optimizer.baseline_plan(), state['greens'].shape)
+
+def density_policy(simulator, state):
+    """TrafficAnalyzer.calculate_optimal_timing: the configured cycle split in proportion to phase density"""
+    densities = np.minimum(1.0, state['queues'] * simulator.queue_density)
+    return split_green_times(
+        densities @ simulator.phase_matrix.T,
+        simulator.total_cycle_time, simulator.min_green_time, simulator.yellow_time
+    )
+
+def webster_policy(simulator, state):
+    """Webster's optimal cycle and flow-ratio split from the arrivals of the last cycle"""
+    n_phases = len(simulator.phase_names)
+    flow_ratios = state['arrival_rates'] / simulator.saturation_flow
+    phase_ratios = np.where(simulator.phase_matrix[None], flow_ratios[:, None, :], 0).max(axis=2)
+    total_ratio = np.minimum(phase_ratios.sum(axis=1), 0.95)
+
+    lost_time = n_phases * (simulator.startup_lost_time + simulator.clearance_lost_time)
+    cycles = np.clip((1.5 * lost_time + 5) / (1 - total_ratio), simulator.cycle_min, simulator.cycle_max)
+    spare = np.maximum(0, cycles - n_phases * (simulator.yellow_time + simulator.min_green_time))
+    shares = np.divide(
+        phase_ratios, phase_ratios.sum(axis=1, keepdims=True),
+        out=np.full_like(phase_ratios, 1 / n_phases), where=phase_ratios.sum(axis=1, keepdims=True) > 0
+    )
+    return (simulator.min_green_time + np.floor(shares * spare[:, None])).astype(np.int64)
+
+POLICIES = {'fixed': fixed_policy, 'density': density_policy, 'webster': webster_policy}
+
+def random_demand(scenarios, n_approaches, low, high, saturation_flow, rng):
+    """Constant arrival rate (vehicles/minute) per scenario and approach, as a fraction of saturation flow"""
+    return rng.uniform(low, high, (scenarios, 1, n_approaches)) * saturation_flow
+
+def replayed_demand(flow_ratios, timestamps, scenarios, minutes, saturation_flow, rng):
+    """Windows of `minutes` recorded minutes starting at random times, shape (scenarios, minutes, approaches)"""
+    series = pd.DataFrame(flow_ratios, index=pd.DatetimeIndex(timestamps)).sort_index()
+    series = series.resample('1min').mean().ffill().fillna(0.0).to_numpy()
+    if len(series) < minutes:
+        # Short histories are repeated to fill the window
+        series = np.tile(series, (-(-minutes // len(series)), 1))
+    starts = rng.integers(0, len(series) - minutes + 1, scenarios)
+    return series[starts[:, None] + np.arange(minutes)] * saturation_flow
+
+class QueueSimulator:
+    """Discrete-time queues at the configured intersection, for many demand scenarios at once.
+
+    Each approach is a point queue: Poisson arrivals, discharge at the saturation flow while
+    its phase is green (less start-up lost time, plus the usable part of the yellow).
+    Policies choose the green times of every phase at the start of each cycle.
+    """
+
+    def __init__(self, config_file='config.json'):
+        self.optimizer = SignalPlanOptimizer(config_file)
+        self.config = self.optimizer.config
+        self.directions = self.optimizer.directions
+        self.phase_names = self.optimizer.phase_names
+        self.phase_matrix = self.optimizer.phase_matrix
+        self.total_cycle_time = self.optimizer.total_cycle_time
+        self.min_green_time = self.optimizer.min_green_time
+        self.yellow_time = self.optimizer.yellow_time
+        self.saturation_flow = self.optimizer.saturation_flow  # vehicles/minute per approach
+        self.cycle_min = int(self.optimizer.cycles.min())
+        self.cycle_max = int(self.optimizer.cycles.max())
+
+        simulation_config = self.config.get('simulation', {})
+        self.step = simulation_config.get('step', 1.0)
+        self.startup_lost_time = simulation_config.get('startup_lost_time', 2)
+        self.clearance_lost_time = simulation_config.get('clearance_lost_time', 2)
+        self.queue_density = simulation_config.get('queue_density', 0.05)
+        self.seed = simulation_config.get('seed', 0)
+
+    def simulate(self, demand, duration, policy):
+        """Run one policy over demand (scenarios, minutes, approaches) in vehicles/minute for `duration` seconds"""
+        rng = np.random.default_rng(self.seed)  # Same arrivals for every policy
+        n_scenarios, n_minutes, n_approaches = demand.shape
+        n_phases = len(self.phase_names)
+        rows = np.arange(n_scenarios)
+
+        queues = np.zeros((n_scenarios, n_approaches))
+        delay = np.zeros((n_scenarios, n_approaches))
+        max_queues = np.zeros((n_scenarios, n_approaches))
+        arrived = np.zeros((n_scenarios, n_approaches))
+        departed = np.zeros((n_scenarios, n_approaches))
+
+        phase = np.zeros(n_scenarios, dtype=np.int64)
+        elapsed = np.zeros(n_scenarios)
+        cycle_time = np.zeros(n_scenarios)
+        cycle_arrivals = np.zeros((n_scenarios, n_approaches))
+        state = {
+            'queues': queues,
+            'arrival_rates': demand[:, 0].copy(),
+            'greens': np.tile(self.optimizer.baseline_plan(), (n_scenarios, 1))
+        }
+        state['greens'] = np.array(policy(self, state), dtype=np.int64)
+        capacity = self.saturation_flow / 60 * self.step
+
+        for t in range(int(duration / self.step)):
+            rates = demand[:, min(int(t * self.step // 60), n_minutes - 1)]
+            arrivals = rng.poisson(rates / 60 * self.step)
+            queues += arrivals
+
+            # Discharge on green after the start-up lost time, and through the usable part of the yellow
+            green = state['greens'][rows, phase]
+            discharging = (elapsed >= self.startup_lost_time) & (elapsed < green + self.yellow_time - self.clearance_lost_time)
+            served = np.minimum(queues, capacity * (self.phase_matrix[phase] & discharging[:, None]))
+            queues -= served
+
+            delay += queues * self.step
+            np.maximum(max_queues, queues, out=max_queues)
+            arrived += arrivals
+            departed += served
+            cycle_arrivals += arrivals
+
+            # Advance the signal; a new cycle starts when the last phase ends
+            elapsed += self.step
+            cycle_time += self.step
+            phase_end = elapsed >= green + self.yellow_time
+            phase = np.where(phase_end, (phase + 1) % n_phases, phase)
+            elapsed[phase_end] = 0.0
+            new_cycle = phase_end & (phase == 0)
+            if new_cycle.any():
+                state['arrival_rates'] = cycle_arrivals / np.maximum(cycle_time, self.step)[:, None] * 60
+                greens = np.asarray(policy(self, state), dtype=np.int64)
+                state['greens'] = np.where(new_cycle[:, None], greens, state['greens'])
+                cycle_arrivals[new_cycle] = 0.0
+                cycle_time[new_cycle] = 0.0
+
+        return self._summarize(delay, arrived, departed, max_queues, queues, duration)
+
+    def _summarize(self, delay, arrived, departed, max_queues, queues, duration):
+        """Delay, queue and throughput figures of one policy across scenarios"""
+        total_arrived = arrived.sum(axis=1)
+        mean_delay = np.divide(delay.sum(axis=1), total_arrived, out=np.zeros(len(delay)), where=total_arrived > 0)
+        throughput = departed.sum(axis=1) / duration * 3600
+        worst_queues = max_queues.max(axis=1)
+        return {
+            'mean_delay': float(mean_delay.mean()),
+            'p95_delay': float(np.percentile(mean_delay, 95)),
+            'max_queue': float(worst_queues.mean()),
+            'worst_queue': float(worst_queues.max()),
+            'throughput': float(throughput.mean()),
+            'residual_queue': float(queues.sum(axis=1).mean()),
+            'directions': {
+                direction: {
+                    'mean_delay': float(np.divide(delay[:, a].sum(), max(arrived[:, a].sum(), 1))),
+                    'max_queue': float(max_queues[:, a].mean())
+                }
+                for a, direction in enumerate(self.directions)
+            }
+        }
+
+    def compare(self, demand, duration, policies=POLICIES):
+        """Simulate every policy on the same demand and arrivals; policies maps names to functions"""
+        return {name: self.simulate(demand, duration, policy) for name, policy in policies.items()}
+
+def print_comparison(results):
+    """Table of delay, queue and throughput per policy"""
+    print(f"{'policy':10s} {'delay s/veh':>12s} {'p95':>8s} {'max queue':>10s} {'worst':>8s} {'veh/h':>8s}")
+    for name, result in results.items():
+        print(f"{name:10s} {result['mean_delay']:12.1f} {result['p95_delay']:8.1f} {result['max_queue']:10.1f} "
+              f"{result['worst_queue']:8.0f} {result['throughput']:8.0f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare signal timing policies on simulated intersection queues")
+    parser.add_argument('--config', default='config.json', help="Configuration with the phases and simulation settings")
+    parser.add_argument('--policies', nargs='+', choices=list(POLICIES), default=list(POLICIES))
+    parser.add_argument('--scenarios', type=int, help="Number of demand scenarios (default: simulation.scenarios)")
+    parser.add_argument('--duration', type=float, help="Simulated seconds per scenario (default: simulation.duration)")
+    parser.add_argument('--replay', action='store_true', help="Replay recorded demand instead of random demand")
+    parser.add_argument('--stats', nargs='+', help="Statistics files to replay (default: logging.statistics_file and its daily files)")
+    parser.add_argument('--out', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    simulator = QueueSimulator(args.config)
+    simulation_config = simulator.config.get('simulation', {})
+    scenarios = args.scenarios or simulation_config.get('scenarios', 1000)
+    duration = args.duration or simulation_config.get('duration', 3600)
+    rng = np.random.default_rng(simulator.seed)
+
+    if args.replay:
+        paths = args.stats or find_statistics_files(simulator.config['logging']['statistics_file'])
+        history = load_statistics(paths, simulator.directions)
+        if history.empty:
+            raise SystemExit("No statistics records found to replay")
+        demand = replayed_demand(
+            simulator.optimizer.flow_ratios(history), history['timestamp'], scenarios,
+            int(np.ceil(duration / 60)), simulator.saturation_flow, rng
+        )
+    else:
+        demand = random_demand(
+            scenarios, len(simulator.directions), simulation_config.get('demand_min', 0.05),
+            simulation_config.get('demand_max', 0.4), simulator.saturation_flow, rng
+        )
+
+    results = simulator.compare(demand, duration, {name: POLICIES[name] for name in args.policies})
+    print_comparison(results)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+
+class RegionOfInterest:
+    """Polygon region of a camera view, with points given relative to the frame size (0..1)"""
+
+    def __init__(self, points=None):
+        # No polygon means the whole frame
+        self.points = np.array(points, dtype=np.float32).reshape(-1, 2) if points else None
+        self._cache = {}
+
+    @classmethod
+    def from_config(cls, config, direction):
+        """Create the ROI of a direction from detection.roi in config.json"""
+        return cls(config.get('detection', {}).get('roi', {}).get(direction))
+
+    def _geometry(self, frame_shape):
+        """Polygon, bounding box, area and mask in pixels for one frame size (cached)"""
+        height, width = frame_shape[:2]
+        key = (height, width)
+        geometry = self._cache.get(key)
+        if geometry is not None:
+            return geometry
+
+        if self.points is None:
+            polygon = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.int32)
+        else:
+            polygon = np.round(self.points * [width, height]).astype(np.int32)
+            polygon[:, 0] = np.clip(polygon[:, 0], 0, width)
+            polygon[:, 1] = np.clip(polygon[:, 1], 0, height)
+
+        x, y, w, h = cv2.boundingRect(polygon)
+        w = max(1, min(w, width - x))
+        h = max(1, min(h, height - y))
+
+        mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(mask, [polygon], 255)
+        area = max(1, int(np.count_nonzero(mask)))
+
+        geometry = {'polygon': polygon, 'rect': (x, y, w, h), 'area': area, 'mask': mask}
+        self._cache[key] = geometry
+        return geometry
+
+    def polygon(self, frame_shape):
+        """ROI polygon in pixel coordinates"""
+        return self._geometry(frame_shape)['polygon']
+
+    def bounding_rect(self, frame_shape):
+        """Bounding box (x, y, w, h) of the ROI in pixels"""
+        return self._geometry(frame_shape)['rect']
+
+    def area(self, frame_shape):
+        """Number of frame pixels inside the ROI"""
+        return self._geometry(frame_shape)['area']
+
+    def mask(self, frame_shape):
+        """uint8 mask with 255 inside the ROI"""
+        return self._geometry(frame_shape)['mask']
+
+    def coverage(self, boxes, frame_shape):
+        """Fraction of ROI pixels covered by (x, y, w, h) boxes; overlapping boxes count once"""
+        boxes = np.round(np.asarray(boxes, dtype=np.float64).reshape(-1, 4)).astype(np.int64)
+        geometry = self._geometry(frame_shape)
+        x, y, w, h = geometry['rect']
+
+        # Rasterize the boxes at the ROI's bounding rect, clipped to it
+        x1 = np.clip(boxes[:, 0] - x, 0, w)
+        y1 = np.clip(boxes[:, 1] - y, 0, h)
+        x2 = np.clip(boxes[:, 0] + boxes[:, 2] - x, 0, w)
+        y2 = np.clip(boxes[:, 1] + boxes[:, 3] - y, 0, h)
+        covered = np.zeros((h, w), dtype=np.uint8)
+        for left, top, right, bottom in zip(x1, y1, x2, y2):
+            covered[top:bottom, left:right] = 255
+
+        covered = cv2.bitwise_and(covered, geometry['mask'][y:y + h, x:x + w])
+        return cv2.countNonZero(covered) / geometry['area']
+
+    def contains(self, points, frame_shape):
+        """Check which (x, y) pixel points lie inside the ROI"""
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        if self.points is None:
+            return np.ones(len(points), dtype=bool)
+        mask = self.mask(frame_shape)
+        height, width = mask.shape
+        xs = np.clip(points[:, 0], 0, width - 1)
+        ys = np.clip(points[:, 1], 0, height - 1)
+        return mask[ys, xs] > 0
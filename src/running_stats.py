@@ -0,0 +1,79 @@
+import numpy as np
+
+class RunningAggregates:
+    """Per-approach statistics of all logged records, updated in O(1) per record"""
+
+    def __init__(self, directions):
+        self.directions = list(directions)
+        n_directions = len(self.directions)
+
+        self.count = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+        # Density: sum, Welford mean / sum of squared deviations, and peak with its time
+        self.density_sum = np.zeros(n_directions, dtype=np.float64)
+        self.density_mean = np.zeros(n_directions, dtype=np.float64)
+        self.density_m2 = np.zeros(n_directions, dtype=np.float64)
+        self.density_max = np.full(n_directions, -np.inf, dtype=np.float64)
+        self.density_max_time = np.empty(n_directions, dtype=object)
+
+        # Detected vehicles summed over records
+        self.vehicle_sum = np.zeros(n_directions, dtype=np.int64)
+
+        # Phase duration mean and how many records fell in each phase
+        self.phase_time_mean = 0.0
+        self.phase_counts = {}
+
+    def update(self, timestamp, densities, vehicle_counts, phase, phase_time):
+        """Add one record; densities and vehicle_counts are ordered like self.directions"""
+        densities = np.asarray(densities, dtype=np.float64)
+        self.count += 1
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+        self.density_sum += densities
+        delta = densities - self.density_mean
+        self.density_mean += delta / self.count
+        self.density_m2 += delta * (densities - self.density_mean)
+
+        # Strictly greater keeps the first peak, like idxmax
+        new_peak = densities > self.density_max
+        self.density_max[new_peak] = densities[new_peak]
+        self.density_max_time[new_peak] = timestamp
+
+        self.vehicle_sum += np.asarray(vehicle_counts, dtype=np.int64)
+
+        self.phase_time_mean += (phase_time - self.phase_time_mean) / self.count
+        self.phase_counts[phase] = self.phase_counts.get(phase, 0) + 1
+
+    def density_variance(self):
+        """Sample variance of each approach's density"""
+        if self.count < 2:
+            return np.zeros(len(self.directions), dtype=np.float64)
+        return self.density_m2 / (self.count - 1)
+
+    def get_summary(self):
+        """Plain-dict snapshot of the aggregates, cheap enough to poll"""
+        variance = self.density_variance()
+        return {
+            'records': self.count,
+            'start': self.first_timestamp,
+            'end': self.last_timestamp,
+            'directions': {
+                direction: {
+                    'density_sum': float(self.density_sum[i]),
+                    'density_mean': float(self.density_mean[i]),
+                    'density_variance': float(variance[i]),
+                    'density_std': float(np.sqrt(variance[i])),
+                    'density_max': float(self.density_max[i]) if self.count else 0.0,
+                    'density_max_time': self.density_max_time[i],
+                    'total_vehicles': int(self.vehicle_sum[i])
+                }
+                for i, direction in enumerate(self.directions)
+            },
+            'phase_time_mean': self.phase_time_mean,
+            'phase_counts': dict(sorted(self.phase_counts.items(), key=lambda item: item[1], reverse=True))
+        }
@@ -0,0 +1,283 @@
+import os
+import re
+import glob
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+def find_statistics_files(statistics_file):
+    """The statistics file and its daily / numbered parts (traffic_stats_2024-05-01.csv, ...-1.parquet)"""
+    root = os.path.splitext(statistics_file)[0]
+    pattern = re.compile(re.escape(os.path.basename(root)) + r'(_\d{4}-\d{2}-\d{2})?(-\d+)?\.(csv|parquet)$')
+    return sorted(
+        path for path in glob.glob(glob.escape(root) + '*')
+        if pattern.fullmatch(os.path.basename(path))
+    )
+
+def load_statistics(paths, directions):
+    """Timestamps plus density and flow columns of the given statistics files as one DataFrame"""
+    wanted = ['timestamp'] + [f'{d}_{column}' for d in directions for column in ('density', 'flow')]
+    frames = []
+    for path in paths:
+        if path.endswith('.parquet'):
+            frame = pd.read_parquet(path)
+            frame = frame[[column for column in wanted if column in frame.columns]]
+        else:
+            frame = pd.read_csv(path, usecols=lambda column: column in wanted)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=wanted)
+    history = pd.concat(frames, ignore_index=True)
+    history['timestamp'] = pd.to_datetime(history['timestamp'], format='ISO8601')
+    return history
+
+def green_splits(n_phases, step):
+    """Every split of the green time into phase shares that are multiples of `step`, shape (splits, phases)"""
+    if n_phases == 1:
+        return np.ones((1, 1))
+    units = int(round(1 / step))
+    # Stars and bars: choose n_phases - 1 divider positions among units + n_phases - 1 slots
+    dividers = np.array(np.meshgrid(*[np.arange(units + 1)] * (n_phases - 1), indexing='ij')).reshape(n_phases - 1, -1).T
+    dividers = dividers[np.all(np.diff(dividers, axis=1) >= 0, axis=1)]
+    bounds = np.column_stack([np.zeros(len(dividers), dtype=np.int64), dividers, np.full(len(dividers), units)])
+    return np.diff(bounds, axis=1) / units
+
+def candidate_plans(n_phases, cycles, split_step, min_green_time, yellow_time):
+    """Cycle length and integer green time per phase of every candidate plan"""
+    shares = green_splits(n_phases, split_step)
+    plan_cycles, plan_greens = [], []
+    for cycle in cycles:
+        spare = cycle - n_phases * (yellow_time + min_green_time)
+        if spare < 0:
+            continue
+        greens = min_green_time + np.floor(shares * spare).astype(np.int64)
+        # The last phase takes what rounding left over, so every plan fills its cycle exactly
+        greens[:, -1] += cycle - n_phases * yellow_time - greens.sum(axis=1)
+        plan_cycles.append(np.full(len(greens), cycle))
+        plan_greens.append(greens)
+    if not plan_cycles:
+        raise ValueError("No cycle length leaves room for the minimum green time of every phase")
+    greens = np.unique(np.concatenate(plan_greens), axis=0)
+    return greens.sum(axis=1) + n_phases * yellow_time, greens
+
+def webster_delay(flow_ratios, green_ratios, cycles, saturation_flow, period):
+    """Average delay per vehicle (seconds) from Webster's formula, for every (bin, plan, approach).
+
+    flow_ratios (bins, 1, approaches) is demand over saturation flow, green_ratios (1, plans,
+    approaches) effective green over cycle, cycles (1, plans, 1). Oversaturated approaches get the
+    deterministic overflow delay of a queue growing for `period` seconds on top of Webster's delay
+    at a saturation of 0.98, so overloaded plans stay comparable instead of becoming infinite.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saturation = np.where(green_ratios > 0, flow_ratios / green_ratios, np.inf)
+        capped = np.minimum(saturation, 0.98)
+        uniform = cycles * (1 - green_ratios) ** 2 / (2 * (1 - capped * green_ratios))
+        arrivals = flow_ratios * saturation_flow
+        random = np.where(arrivals > 0, capped ** 2 / (2 * arrivals * (1 - capped)), 0.0)
+        overflow = np.where(saturation > 1, period / 2 * (1 - 1 / saturation), 0.0)
+    return 0.9 * (uniform + random) + overflow
+
+class SignalPlanOptimizer:
+    """Choose time-of-day signal plans that minimize Webster delay over the recorded statistics"""
+
+    def __init__(self, config_file='config.json'):
+        with open(config_file, 'r') as f:
+            self.config = json.load(f)
+
+        traffic_light_config = self.config['traffic_light']
+        self.total_cycle_time = traffic_light_config.get('total_cycle_time', 120)
+        self.min_green_time = traffic_light_config.get('min_green_time', 20)
+        self.yellow_time = traffic_light_config.get('yellow_time', 3)
+        self.phase_names = list(traffic_light_config['phases'].keys())
+
+        # Only approaches served by some phase take part in the plan
+        self.directions = [
+            direction for direction in self.config['video_sources']
+            if any(direction in directions for directions in traffic_light_config['phases'].values())
+        ]
+        self.phase_matrix = np.array([
+            [direction in traffic_light_config['phases'][phase] for direction in self.directions]
+            for phase in self.phase_names
+        ])
+
+        optimizer_config = self.config.get('optimizer', {})
+        self.cycles = np.arange(
+            optimizer_config.get('cycle_min', 40),
+            optimizer_config.get('cycle_max', 150) + 1,
+            optimizer_config.get('cycle_step', 5)
+        )
+        self.split_step = optimizer_config.get('split_step', 0.05)
+        self.bin_minutes = optimizer_config.get('bin_minutes', 30)
+        self.max_plans = optimizer_config.get('max_plans', 4)
+        self.min_plan_minutes = optimizer_config.get('min_plan_minutes', 60)
+        self.min_improvement = optimizer_config.get('min_improvement', 0.01)
+        self.saturation_flow = optimizer_config.get('saturation_flow', 30)  # vehicles/minute per approach
+        self.demand = optimizer_config.get('demand', 'auto')
+
+        self.plan_cycles, self.plan_greens = candidate_plans(
+            len(self.phase_names), self.cycles, self.split_step, self.min_green_time, self.yellow_time
+        )
+
+    def flow_ratios(self, history):
+        """Demand of every record as a fraction of the saturation flow, shape (records, approaches)"""
+        flow_columns = [f'{d}_flow' for d in self.directions]
+        use_flow = self.demand == 'flow' or (
+            self.demand == 'auto' and all(column in history for column in flow_columns)
+            and history[flow_columns].to_numpy(dtype=np.float64).any()
+        )
+        if use_flow:
+            # Tracked vehicles per minute over the approach's saturation flow
+            return history[flow_columns].to_numpy(dtype=np.float64) / self.saturation_flow
+        # Without tracking, road occupancy stands in for the degree of saturation
+        return history[[f'{d}_density' for d in self.directions]].to_numpy(dtype=np.float64)
+
+    def time_of_day_profile(self, history):
+        """Mean flow ratio per time-of-day bin and approach, and the number of records in each bin"""
+        n_bins = 24 * 60 // self.bin_minutes
+        timestamps = history['timestamp']
+        bins = ((timestamps.dt.hour * 60 + timestamps.dt.minute) // self.bin_minutes).to_numpy()
+        counts = np.bincount(bins, minlength=n_bins)
+        ratios = self.flow_ratios(history)
+        sums = np.stack([np.bincount(bins, ratios[:, a], minlength=n_bins) for a in range(ratios.shape[1])], axis=1)
+        profile = np.divide(sums, counts[:, None], out=np.zeros_like(sums), where=counts[:, None] > 0)
+        return profile, counts
+
+    def plan_delays(self, profile, plan_cycles=None, plan_greens=None, chunk_elements=4_000_000):
+        """Total delay (vehicle-seconds) of every plan (default: all candidates) in every time-of-day bin, shape (bins, plans)"""
+        if plan_cycles is None:
+            plan_cycles, plan_greens = self.plan_cycles, self.plan_greens
+        n_bins, n_approaches = profile.shape
+        period = self.bin_minutes * 60
+        flow_ratios = profile[:, None, :]
+        arrivals = flow_ratios * self.saturation_flow / 60  # vehicles/second
+
+        # Green of an approach is that of the phase serving it
+        approach_greens = np.where(self.phase_matrix[None], plan_greens[:, :, None], 0).max(axis=1)
+
+        delays = np.empty((n_bins, len(plan_cycles)))
+        chunk = max(1, chunk_elements // (n_bins * n_approaches))
+        for start in range(0, len(plan_cycles), chunk):
+            cycles = plan_cycles[start:start + chunk]
+            green_ratios = approach_greens[start:start + chunk] / cycles[:, None]
+            per_vehicle = webster_delay(
+                flow_ratios, green_ratios[None], cycles[None, :, None], self.saturation_flow / 60, period
+            )
+            delays[:, start:start + chunk] = (per_vehicle * arrivals * period).sum(axis=2)
+        return delays
+
+    def segment_plans(self, delays):
+        """Split the day into at most max_plans periods, each with the plan minimizing its total delay.
+
+        Returns [(start_bin, end_bin, plan_index, delay)] from dynamic programming over plan boundaries.
+        """
+        n_bins = len(delays)
+        min_bins = max(1, min(n_bins, self.min_plan_minutes // self.bin_minutes))
+        cumulative = np.vstack([np.zeros(delays.shape[1]), np.cumsum(delays, axis=0)])
+
+        # Best plan and its delay for every period [i, j)
+        segment_cost = np.full((n_bins + 1, n_bins + 1), np.inf)
+        segment_plan = np.zeros((n_bins + 1, n_bins + 1), dtype=np.int64)
+        for i in range(n_bins - min_bins + 1):
+            totals = cumulative[i + min_bins:] - cumulative[i]
+            segment_plan[i, i + min_bins:] = totals.argmin(axis=1)
+            segment_cost[i, i + min_bins:] = totals.min(axis=1)
+
+        # best[n, j]: least delay covering bins [0, j) with n + 1 periods
+        best = np.full((self.max_plans, n_bins + 1), np.inf)
+        previous = np.zeros((self.max_plans, n_bins + 1), dtype=np.int64)
+        best[0] = segment_cost[0]
+        for n in range(1, self.max_plans):
+            candidates = best[n - 1][:, None] + segment_cost
+            previous[n] = candidates.argmin(axis=0)
+            best[n] = candidates.min(axis=0)
+
+        # Fewest periods whose delay is within min_improvement of the best schedule
+        totals = best[:, n_bins]
+        n = int(np.argmax(totals <= totals.min() * (1 + self.min_improvement)))
+        segments = []
+        end = n_bins
+        for level in range(n, -1, -1):
+            start = previous[level, end] if level > 0 else 0
+            segments.append((start, end, int(segment_plan[start, end]), float(segment_cost[start, end])))
+            end = start
+        return segments[::-1]
+
+    def baseline_plan(self):
+        """Configured cycle split evenly between the phases (what the intersection runs without a plan)"""
+        n_phases = len(self.phase_names)
+        available = self.total_cycle_time - n_phases * self.yellow_time
+        greens = np.full(n_phases, available // n_phases)
+        greens[-1] += available - greens.sum()
+        return greens
+
+    def _clock_time(self, bin_index):
+        minutes = bin_index * self.bin_minutes
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def optimize(self, history):
+        """Time-of-day plan for a statistics history"""
+        profile, counts = self.time_of_day_profile(history)
+        delays = self.plan_delays(profile)
+        baseline_greens = self.baseline_plan()[None]
+        baseline = self.plan_delays(profile, np.array([self.total_cycle_time]), baseline_greens)[:, 0]
+        vehicles_per_bin = profile.sum(axis=1) * self.saturation_flow * self.bin_minutes
+
+        plans = []
+        for start, end, plan_index, delay in self.segment_plans(delays):
+            vehicles = vehicles_per_bin[start:end].sum()
+            baseline_delay = baseline[start:end].sum()
+            greens = self.plan_greens[plan_index]
+            plans.append({
+                'start': self._clock_time(start),
+                'end': self._clock_time(end) if end < len(profile) else '24:00',
+                'cycle': int(self.plan_cycles[plan_index]),
+                'green_times': dict(zip(self.phase_names, greens.tolist())),
+                'records': int(counts[start:end].sum()),
+                'delay_per_vehicle': delay / vehicles if vehicles > 0 else 0.0,
+                'baseline_delay_per_vehicle': baseline_delay / vehicles if vehicles > 0 else 0.0
+            })
+        return {
+            'records': len(history),
+            'first': str(history['timestamp'].min()) if len(history) else None,
+            'last': str(history['timestamp'].max()) if len(history) else None,
+            'candidates': len(self.plan_cycles),
+            'baseline': {
+                'cycle': self.total_cycle_time,
+                'green_times': dict(zip(self.phase_names, self.baseline_plan().tolist()))
+            },
+            'plans': plans
+        }
+
+def print_plan(result):
+    """Time-of-day plan as a table"""
+    print(f"{result['records']} records from {result['first']} to {result['last']}, "
+          f"{result['candidates']} candidate plans per period")
+    for plan in result['plans']:
+        greens = ', '.join(f"{phase} {green}s" for phase, green in plan['green_times'].items())
+        print(f"{plan['start']}-{plan['end']}  cycle {plan['cycle']:3d}s  {greens}  "
+              f"delay {plan['delay_per_vehicle']:.1f}s/veh (baseline {plan['baseline_delay_per_vehicle']:.1f}s/veh)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Optimize a time-of-day signal plan from recorded traffic statistics")
+    parser.add_argument('--config', default='config.json', help="Configuration with the phases and optimizer settings")
+    parser.add_argument('--stats', nargs='+', help="Statistics files (default: logging.statistics_file and its daily files)")
+    parser.add_argument('--days', choices=('all', 'weekdays', 'weekends'), default='all', help="Days of the week to plan for")
+    parser.add_argument('--out', help="Write the plan to this JSON file")
+    args = parser.parse_args()
+
+    optimizer = SignalPlanOptimizer(args.config)
+    paths = args.stats or find_statistics_files(optimizer.config['logging']['statistics_file'])
+    history = load_statistics(paths, optimizer.directions)
+    if args.days != 'all':
+        weekend = history['timestamp'].dt.dayofweek >= 5
+        history = history[weekend if args.days == 'weekends' else ~weekend]
+    if history.empty:
+        print("No statistics records found")
+    else:
+        result = optimizer.optimize(history)
+        print_plan(result)
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(result, f, indent=2)
+            print(f"Plan written to {args.out}")
@@ -0,0 +1,115 @@
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+def format_stage_summary(summary):
+    """One line with p50/p95/p99 (ms) of every stage"""
+    return ' | '.join(
+        f"{stage} {stats['all']['p50_ms']:.1f}/{stats['all']['p95_ms']:.1f}/{stats['all']['p99_ms']:.1f}"
+        for stage, stats in summary.items()
+    )
+
+class StageTimer:
+    """Rolling timings of pipeline stages, per direction, with percentiles over the last `window` samples"""
+
+    def __init__(self, window=1000, enabled=True):
+        self.window = max(1, int(window))
+        self.enabled = enabled
+        self.lock = threading.Lock()
+
+        # (stage, direction) -> ring buffer of durations (seconds) and total samples seen
+        self.samples = {}
+        self.counts = {}
+
+    def record(self, stage, seconds, direction=None):
+        """Add one duration for a stage (and direction, if the stage runs per direction)"""
+        if not self.enabled:
+            return
+        key = (stage, direction)
+        with self.lock:
+            values = self.samples.get(key)
+            if values is None:
+                values = self.samples[key] = np.zeros(self.window, dtype=np.float64)
+                self.counts[key] = 0
+            values[self.counts[key] % self.window] = seconds
+            self.counts[key] += 1
+
+    @contextmanager
+    def time(self, stage, direction=None):
+        """Time the body of a with block as one sample of a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, direction)
+
+    def _windows(self):
+        """Copy of the filled part of every ring buffer, grouped by stage"""
+        with self.lock:
+            windows = {}
+            for (stage, direction), values in self.samples.items():
+                filled = values[:min(self.counts[(stage, direction)], self.window)].copy()
+                windows.setdefault(stage, {})[direction] = (filled, self.counts[(stage, direction)])
+        return windows
+
+    @staticmethod
+    def _describe(values, count):
+        """Sample count, mean and p50/p95/p99 in milliseconds"""
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+        return {
+            'count': count,
+            'mean_ms': float(values.mean() * 1000),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99)
+        }
+
+    def get_summary(self):
+        """Percentiles for every stage, overall and per direction"""
+        summary = {}
+        for stage, directions in self._windows().items():
+            combined = np.concatenate([values for values, _ in directions.values()])
+            stage_summary = {'all': self._describe(combined, sum(count for _, count in directions.values()))}
+            for direction, (values, count) in directions.items():
+                if direction is not None:
+                    stage_summary[direction] = self._describe(values, count)
+            summary[stage] = stage_summary
+        return summary
+
+    def write_json(self, path, summary=None):
+        """Write the percentiles to a JSON file, replacing the previous snapshot"""
+        summary = self.get_summary() if summary is None else summary
+        with open(path, 'w') as f:
+            json.dump({'time': time.time(), 'window': self.window, 'stages': summary}, f, indent=2)
+
+class ProfileWindow:
+    """cProfile capture of the calling thread for a limited number of seconds"""
+
+    def __init__(self, duration, output_file='profile.prof'):
+        self.duration = duration
+        self.output_file = output_file
+        self.profiler = None
+        self.start_time = None
+        self.finished = False
+
+    def check(self):
+        """Call once per loop iteration: starts the capture on the first call, saves it when time is up"""
+        if self.finished:
+            return
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.start_time = time.perf_counter()
+            self.profiler.enable()
+        elif time.perf_counter() - self.start_time >= self.duration:
+            self.stop()
+
+    def stop(self):
+        """End the capture early (e.g. on shutdown) and write the profile"""
+        if self.profiler is None or self.finished:
+            return
+        self.profiler.disable()
+        self.profiler.dump_stats(self.output_file)
+        self.finished = True
@@ -0,0 +1,109 @@
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+class ColumnarStatsBuffer:
+    """Preallocated typed columns holding a bounded number of statistics records"""
+
+    def __init__(self, columns, capacity=1000):
+        # columns maps column name to NumPy dtype, in output order
+        self.capacity = max(1, int(capacity))
+        self.columns = {name: np.empty(self.capacity, dtype=dtype) for name, dtype in columns.items()}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def is_full(self):
+        return self.size >= self.capacity
+
+    def append(self, record):
+        """Store one record; the caller flushes before the buffer overflows"""
+        for name, column in self.columns.items():
+            column[self.size] = record[name]
+        self.size += 1
+
+    def to_frame(self):
+        """Buffered records as a DataFrame (copies, so the buffer can be reused)"""
+        return pd.DataFrame({name: column[:self.size].copy() for name, column in self.columns.items()})
+
+    def clear(self):
+        self.size = 0
+
+class ChunkedStatsWriter:
+    """Append chunks of statistics to CSV or Parquet files, one file per day when rotating"""
+
+    def __init__(self, statistics_file, file_format='csv', rotate_daily=True):
+        if file_format == 'parquet' and pq is None:
+            # Parquet needs pyarrow; keep the statistics as CSV instead
+            file_format = 'csv'
+        self.file_format = file_format
+        self.rotate_daily = rotate_daily
+        self.root = os.path.splitext(statistics_file)[0]
+        self.extension = '.parquet' if file_format == 'parquet' else '.csv'
+
+        # Files written by this writer, in order; the open Parquet writer and the path it was opened for
+        self.files = []
+        self.parquet_writer = None
+        self.parquet_key = None
+
+    def path_for(self, day):
+        """Output file for records of a given day"""
+        if self.rotate_daily:
+            return f"{self.root}_{day:%Y-%m-%d}{self.extension}"
+        return self.root + self.extension
+
+    def write(self, frame):
+        """Append a chunk of records, split by day when rotating"""
+        if frame.empty:
+            return
+        if self.rotate_daily:
+            days = frame['timestamp'].dt.normalize()
+            for day in days.unique():
+                self._write_file(self.path_for(pd.Timestamp(day)), frame[days == day])
+        else:
+            self._write_file(self.path_for(None), frame)
+
+    def _write_file(self, path, frame):
+        if self.file_format == 'parquet':
+            self._write_parquet(path, frame)
+            return
+
+        if path not in self.files:
+            # A daily file from an earlier run of the same day is continued; a fixed file is replaced
+            append = self.rotate_daily and os.path.exists(path)
+            frame.to_csv(path, mode='a' if append else 'w', header=not append, index=False)
+            self.files.append(path)
+        else:
+            frame.to_csv(path, mode='a', header=False, index=False)
+
+    def _write_parquet(self, path, frame):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if path != self.parquet_key:
+            self._close_parquet()
+            self.parquet_key = path
+            if os.path.exists(path):
+                # Parquet files cannot be appended to once closed; continue in a numbered part
+                base, extension = os.path.splitext(path)
+                part = 1
+                while os.path.exists(f"{base}-{part}{extension}"):
+                    part += 1
+                path = f"{base}-{part}{extension}"
+            self.parquet_writer = pq.ParquetWriter(path, table.schema)
+            self.files.append(path)
+        self.parquet_writer.write_table(table)
+
+    def _close_parquet(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+            self.parquet_key = None
+
+    def close(self):
+        self._close_parquet()
@@ -0,0 +1,84 @@
+import json
+import queue
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+def _json_default(value):
+    """Serialize NumPy scalars and timestamps in log records"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, then the event name and its fields (or the message)"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname
+        }
+        if hasattr(record, 'event'):
+            entry['event'] = record.event
+            entry.update(record.fields)
+        else:
+            entry['message'] = record.getMessage()
+        return json.dumps(entry, ensure_ascii=False, default=_json_default)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines, with structured events rendered by a callback returning a list of lines"""
+
+    def __init__(self, renderer):
+        super().__init__()
+        self.renderer = renderer
+
+    def format(self, record):
+        if hasattr(record, 'event'):
+            lines = self.renderer(record.event, record.fields)
+        else:
+            lines = [record.getMessage()]
+        prefix = f"{self.formatTime(record)} - {record.levelname} - "
+        return '\n'.join(prefix + line for line in lines)
+
+class AsyncLogHandler(QueueHandler):
+    """Hand records to a background writer thread through a bounded queue, dropping them when it is full"""
+
+    def __init__(self, target_handler, queue_size=1000):
+        super().__init__(queue.Queue(maxsize=max(1, int(queue_size))))
+        self.target_handler = target_handler
+        self.listener = QueueListener(self.queue, target_handler)
+        self.listener.start()
+
+        self.counter_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.users = 0
+
+    def prepare(self, record):
+        # Formatting happens on the writer thread, so the record is queued as is
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # A slow disk must not stall the processing thread
+            with self.counter_lock:
+                self.dropped += 1
+            return
+        with self.counter_lock:
+            self.enqueued += 1
+
+    def get_stats(self):
+        """Records queued, dropped and still waiting to be written"""
+        with self.counter_lock:
+            return {'enqueued': self.enqueued, 'dropped': self.dropped, 'pending': self.queue.qsize()}
+
+    def close(self):
+        # Write out what is still queued, then close the file (logging also closes handlers at exit)
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.target_handler.close()
+        super().close()
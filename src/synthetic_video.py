@@ -0,0 +1,106 @@
+import os
+import argparse
+import cv2
+import numpy as np
+
+DIRECTIONS = ('north', 'south', 'east', 'west')
+
+class SyntheticTrafficScene:
+    """Deterministic camera view of a road with vehicles driving towards the camera"""
+
+    def __init__(self, width=640, height=480, vehicles=6, speed=4.0, lanes=3, noise=2.0, seed=0):
+        self.width = width
+        self.height = height
+        self.speed = speed
+        rng = np.random.default_rng(seed)
+
+        # Static background: grass verges, asphalt and dashed lane markings
+        self.background = np.empty((height, width, 3), dtype=np.uint8)
+        self.background[:] = (60, 110, 70)
+        self.road_x1 = width // 6
+        self.road_x2 = width - width // 6
+        self.background[:, self.road_x1:self.road_x2] = (105, 105, 105)
+        self.lane_width = (self.road_x2 - self.road_x1) / lanes
+        for lane in range(1, lanes):
+            x = int(self.road_x1 + lane * self.lane_width)
+            for y in range(0, height, 40):
+                cv2.line(self.background, (x, y), (x, y + 20), (230, 230, 230), 2)
+
+        # Vehicles: lane, size, colour, starting offset and relative speed
+        self.vehicle_lanes = rng.integers(0, lanes, vehicles)
+        self.vehicle_widths = (self.lane_width * rng.uniform(0.55, 0.8, vehicles)).astype(np.int64)
+        self.vehicle_heights = (self.vehicle_widths * rng.uniform(0.6, 1.1, vehicles)).astype(np.int64)
+        self.vehicle_colors = rng.integers(0, 80, (vehicles, 3))
+        self.vehicle_offsets = rng.uniform(0, height, vehicles)
+        self.vehicle_speeds = rng.uniform(0.7, 1.3, vehicles)
+
+        # A few fixed noise frames cycled over time keep the sensor noise deterministic and cheap
+        self.noise_frames = [
+            rng.normal(0, noise, (height, width, 1)).astype(np.int16) for _ in range(4)
+        ] if noise > 0 else []
+
+    def vehicle_boxes(self, index):
+        """Ground-truth (x, y, w, h) boxes of the vehicles in frame `index`"""
+        span = self.height + self.vehicle_heights
+        ys = (self.vehicle_offsets + index * self.speed * self.vehicle_speeds) % span - self.vehicle_heights
+        centers = self.road_x1 + (self.vehicle_lanes + 0.5) * self.lane_width
+        xs = centers - self.vehicle_widths / 2
+        return np.column_stack([xs, ys, self.vehicle_widths, self.vehicle_heights]).astype(np.int64)
+
+    def frame(self, index):
+        """Render frame `index` (the same index always gives the same image)"""
+        frame = self.background.copy()
+        for (x, y, w, h), color in zip(self.vehicle_boxes(index).tolist(), self.vehicle_colors.tolist()):
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+            # Windscreen
+            cv2.rectangle(frame, (x + w // 6, y + h // 6), (x + w - w // 6, y + h // 3), (170, 160, 150), -1)
+        if self.noise_frames:
+            noisy = frame.astype(np.int16) + self.noise_frames[index % len(self.noise_frames)]
+            frame = np.clip(noisy, 0, 255).astype(np.uint8)
+        return frame
+
+def generate_frames(frames=250, **scene_options):
+    """Yield the frames of one synthetic clip"""
+    scene = SyntheticTrafficScene(**scene_options)
+    for index in range(frames):
+        yield scene.frame(index)
+
+def write_video(path, frames=250, fps=25, **scene_options):
+    """Write one synthetic clip to an mp4 file"""
+    scene = SyntheticTrafficScene(**scene_options)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (scene.width, scene.height))
+    try:
+        for index in range(frames):
+            writer.write(scene.frame(index))
+    finally:
+        writer.release()
+    return path
+
+def generate_intersection(output_dir, frames=250, fps=25, directions=DIRECTIONS, seed=0, **scene_options):
+    """Write one clip per direction (e.g. north.mp4) and return {direction: path}"""
+    os.makedirs(output_dir, exist_ok=True)
+    return {
+        direction: write_video(
+            os.path.join(output_dir, f"{direction}.mp4"), frames, fps, seed=seed + i, **scene_options
+        )
+        for i, direction in enumerate(directions)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic traffic clips, one per direction")
+    parser.add_argument('output_dir', help="Directory for north.mp4, south.mp4, east.mp4 and west.mp4")
+    parser.add_argument('--frames', type=int, default=250, help="Frames per clip")
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--vehicles', type=int, default=6, help="Vehicles per clip")
+    parser.add_argument('--speed', type=float, default=4.0, help="Vehicle speed in pixels per frame (0 for a static scene)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_intersection(
+        args.output_dir, args.frames, args.fps, seed=args.seed,
+        width=args.width, height=args.height, vehicles=args.vehicles, speed=args.speed
+    )
+    for direction, path in paths.items():
+        print(f"{direction}: {path}")
@@ -1,152 +1,273 @@
 import numpy as np
-import time
+import json
+from roi import RegionOfInterest
+from occupancy import OccupancyEstimator, density_engine
+from clock import WallClock
+
+# Vietnamese names of the usual approaches; other approaches are shown by their config name
+DIRECTION_NAMES = {'north': 'Bắc', 'south': 'Nam', 'east': 'Đông', 'west': 'Tây'}
+
+def direction_label(direction):
+    """Display name of an approach"""
+    return DIRECTION_NAMES.get(direction, direction)
+
+def split_green_times(phase_densities, total_cycle_time=120, min_green_time=20, yellow_time=3,
+                      default_green_time=30):
+    """Split the cycle's green time between phases in proportion to their density.
+    
+    Works on arrays shaped (..., phases), so many intersections or scenarios can be
+    split in one call. Every phase first gets its minimum green and yellow, then the
+    spare time is shared out; the last phase takes the remainder of the cycle.
+    """
+    densities = np.asarray(phase_densities, dtype=np.float64)
+    n_phases = densities.shape[-1]
+    spare_time = max(0, total_cycle_time - n_phases * (min_green_time + yellow_time))
+    
+    total_density = densities.sum(axis=-1, keepdims=True)
+    shares = np.divide(densities, total_density, out=np.zeros_like(densities), where=total_density > 0)
+    extra_times = np.floor(shares * spare_time).astype(np.int64)
+    extra_times[..., -1] = spare_time - extra_times[..., :-1].sum(axis=-1)
+    green_times = min_green_time + extra_times
+    
+    # Without any traffic there is nothing to split
+    return np.where(total_density > 0, green_times, default_green_time)
 
 class TrafficAnalyzer:
-    def __init__(self):
-        # Initialize for 4 directions
-        self.directions = ['north', 'south', 'east', 'west']
-        self.traffic_density = {direction: 0 for direction in self.directions}
-        self.vehicle_counts = {direction: 0 for direction in self.directions}
-        
-        # Traffic light phases for 4-way intersection
-        self.phases = {
-            'phase1': ['north', 'south'],  # North-South green
-            'phase2': ['east', 'west']     # East-West green
+    def __init__(self, config_file='config.json', clock=None):
+        # Load configuration
+        with open(config_file, 'r') as f:
+            self.config = json.load(f)
+            
+        # Source of time for signal phases and recommendations (video time when replaying recordings)
+        self.clock = clock or WallClock()
+        
+        # Approaches (one per camera) and signal phases of the intersection
+        self.directions = list(self.config['video_sources'].keys())
+        self.direction_index = {direction: i for i, direction in enumerate(self.directions)}
+        self.phases = {phase: list(directions) for phase, directions in self.config['traffic_light']['phases'].items()}
+        self.phase_names = list(self.phases.keys())
+        
+        # Signal plan limits
+        traffic_light_config = self.config['traffic_light']
+        self.total_cycle_time = traffic_light_config.get('total_cycle_time', 120)
+        self.min_green_time = traffic_light_config.get('min_green_time', 20)
+        self.yellow_time = traffic_light_config.get('yellow_time', 3)
+        
+        # phase_matrix[p, a] is True when approach a has green in phase p
+        self.phase_matrix = np.zeros((len(self.phase_names), len(self.directions)), dtype=bool)
+        for p, phase in enumerate(self.phase_names):
+            for direction in self.phases[phase]:
+                self.phase_matrix[p, self.direction_index[direction]] = True
+                
+        # Per-approach measurements
+        n_directions = len(self.directions)
+        self.densities = np.zeros(n_directions, dtype=np.float64)
+        self.counts = np.zeros(n_directions, dtype=np.int64)
+        
+        # Unique vehicles passing through and flow rate (vehicles/minute) from the tracker
+        self.unique = np.zeros(n_directions, dtype=np.int64)
+        self.flows = np.zeros(n_directions, dtype=np.float64)
+        
+        # Road region of each camera, so density measures road occupancy
+        self.rois = {direction: RegionOfInterest.from_config(self.config, direction) for direction in self.directions}
+        
+        # Density of each approach from detected boxes, or from a background model (no detector needed)
+        self.density_engines = {direction: density_engine(self.config, direction) for direction in self.directions}
+        density_config = self.config.get('density', {})
+        self.occupancy = {
+            direction: OccupancyEstimator.from_config(density_config)
+            for direction, engine in self.density_engines.items() if engine == 'occupancy'
         }
         
         # Current signal times for each direction
-        self.current_signal_times = {direction: 30 for direction in self.directions}
+        self.signal_times = np.full(n_directions, 30, dtype=np.int64)
         self.density_threshold = 0.3
         
         # Traffic light state
-        self.current_phase = 'phase1'
-        self.last_signal_change = time.time()
+        self.current_phase_index = 0
+        self.last_signal_change = self.clock.now()
         
-        # Timing analysis for 4 directions
-        self.timing_analysis = {
-            direction: {'green_time': 30, 'yellow_time': 3, 'total_cycle': 0} 
-            for direction in self.directions
-        }
+        # Timing analysis for each direction
+        self.green_times = np.full(n_directions, 30, dtype=np.int64)
+        self.yellow_times = np.full(n_directions, self.yellow_time, dtype=np.int64)
         self.analysis_history = []
         
+        # Derived results, cached until a density or the signal state changes
+        self._cache = {}
+        
+        # Recommendations are rebuilt at most once per analysis interval
+        self.recommendation_interval = self.config.get('analysis', {}).get('analysis_interval', 60)
+        self.recommendations = None
+        self.recommendations_stale = True
+        self.last_recommendation_time = 0.0
+        
+    def _invalidate(self):
+        """Drop derived results after a state change"""
+        self._cache.clear()
+        self.recommendations_stale = True
+        
+    def _cached(self, key, compute):
+        """Return a derived result, computing it only if the state changed since last time"""
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = compute()
+        return value
+        
+    def _as_dict(self, values):
+        """Map a per-approach array to a {direction: value} dict"""
+        return dict(zip(self.directions, values.tolist()))
+        
+    @property
+    def current_phase(self):
+        return self.phase_names[self.current_phase_index]
+        
+    @property
+    def traffic_density(self):
+        return self._as_dict(self.densities)
+        
+    @property
+    def vehicle_counts(self):
+        return self._as_dict(self.counts)
+        
+    @property
+    def unique_counts(self):
+        return self._as_dict(self.unique)
+        
+    @property
+    def flow_rates(self):
+        return self._as_dict(self.flows)
+        
+    @property
+    def current_signal_times(self):
+        return self._as_dict(self.signal_times)
+        
     def calculate_density(self, vehicles, direction, frame):
-        """Calculate traffic density based on number and size of detected vehicles"""
-        height, width, _ = frame.shape
-        frame_area = width * height
-        if len(vehicles) > 0:
-            total_vehicle_area = sum(w * h for (_, _, w, h) in vehicles)
-            density = total_vehicle_area / frame_area
+        """Calculate traffic density as the share of the road covered by detected vehicles, or with the occupancy engine"""
+        estimator = self.occupancy.get(direction)
+        if estimator is not None:
+            density = estimator.estimate(frame, self.rois[direction])
+        elif len(vehicles) > 0:
+            density = self.rois[direction].coverage(vehicles, frame.shape)
         else:
             density = 0.0
-        
-        self.traffic_density[direction] = density
-        self.vehicle_counts[direction] = len(vehicles)
+            
+        index = self.direction_index[direction]
+        if density != self.densities[index] or len(vehicles) != self.counts[index]:
+            self.densities[index] = density
+            self.counts[index] = len(vehicles)
+            self._invalidate()
         return density
-
+        
+    def update_flow(self, direction, unique_count, flow_rate):
+        """Record tracked unique vehicle count and flow rate for a direction"""
+        index = self.direction_index[direction]
+        self.unique[index] = unique_count
+        self.flows[index] = flow_rate
+        
+    def congestion_flags(self):
+        """Congestion flag for every approach"""
+        return self.densities > self.density_threshold
+        
     def is_congested(self, direction):
         """Determine if traffic is congested based on density"""
-        return self.traffic_density[direction] > self.density_threshold
-    
+        return bool(self.congestion_flags()[self.direction_index[direction]])
+        
+    def phase_densities(self):
+        """Combined density of every phase"""
+        return self._cached('phase_densities', lambda: self.phase_matrix @ self.densities)
+        
     def get_phase_density(self, phase):
         """Get combined density for a specific phase"""
-        phase_directions = self.phases[phase]
-        total_density = sum(self.traffic_density[direction] for direction in phase_directions)
-        return total_density
-    
+        return float(self.phase_densities()[self.phase_names.index(phase)])
+        
+    def _phase_time(self, phase_index):
+        """Green + yellow time of a phase (the longest of its approaches)"""
+        phase_times = (self.green_times + self.yellow_times)[self.phase_matrix[phase_index]]
+        return int(phase_times.max()) if len(phase_times) else 0
+        
     def analyze_current_timing(self):
         """Analyze current traffic light timing performance"""
-        current_time = time.time()
+        current_time = self.clock.now()
         elapsed_time = current_time - self.last_signal_change
         
         # Calculate current phase time
-        current_phase_directions = self.phases[self.current_phase]
-        current_phase_time = max(
-            self.timing_analysis[direction]['green_time'] + self.timing_analysis[direction]['yellow_time']
-            for direction in current_phase_directions
-        )
+        current_phase_time = self._phase_time(self.current_phase_index)
         
         return {
             'current_phase': self.current_phase,
-            'current_directions': current_phase_directions,
+            'current_directions': self.phases[self.current_phase],
             'elapsed_time': elapsed_time,
             'current_phase_time': current_phase_time,
             'time_remaining': max(0, current_phase_time - elapsed_time)
         }
-    
-    def calculate_optimal_timing(self):
-        """Calculate optimal signal timing based on traffic density comparison for 4-way intersection"""
-        total_cycle_time = 120  # Total cycle time in seconds
-        min_green_time = 20    # Minimum green time for any phase
-        yellow_time = 3        # Yellow time
-        
-        # Calculate density for each phase
-        phase1_density = self.get_phase_density('phase1')  # North-South
-        phase2_density = self.get_phase_density('phase2')  # East-West
-        
-        total_density = phase1_density + phase2_density
-        if total_density == 0:
-            return {direction: 30 for direction in self.directions}
-        
-        # Calculate optimal timing for each phase
-        phase1_time = max(
-            min_green_time,
-            int((phase1_density / total_density) * (total_cycle_time - 2 * yellow_time))
-        )
-        phase2_time = max(
-            min_green_time,
-            total_cycle_time - phase1_time - 2 * yellow_time
+        
+    def optimal_green_times(self):
+        """Optimal green time of every approach as an array"""
+        return self._cached('optimal_green_times', self._compute_optimal_green_times)
+        
+    def _compute_optimal_green_times(self):
+        """Split green time between phases and map it to approaches"""
+        phase_green_times = split_green_times(
+            self.phase_densities(), self.total_cycle_time, self.min_green_time, self.yellow_time
         )
         
-        # Distribute time among directions in each phase
-        optimal_times = {}
-        for direction in self.directions:
-            if direction in self.phases['phase1']:
-                optimal_times[direction] = phase1_time
-            else:
-                optimal_times[direction] = phase2_time
-                
-        return optimal_times
-    
-    def get_timing_recommendation(self):
-        """Generate detailed recommendations based on current and optimal timings for 4-way intersection"""
-        optimal_times = self.calculate_optimal_timing()
-        current_analysis = self.analyze_current_timing()
+        # Each approach gets the green time of the phase(s) serving it
+        approach_green_times = np.where(self.phase_matrix, phase_green_times[:, None], 0).max(axis=0)
+        return np.where(self.phase_matrix.any(axis=0), approach_green_times, 30)
+        
+    def calculate_optimal_timing(self):
+        """Calculate optimal signal timing based on traffic density comparison between phases"""
+        return self._as_dict(self.optimal_green_times())
+        
+    def get_timing_recommendation(self, refresh=False):
+        """Recommendations, rebuilt when the state changed and the analysis interval passed (or on refresh)"""
+        now = self.clock.now()
+        if self.recommendations is None or (
+            self.recommendations_stale and (refresh or now - self.last_recommendation_time >= self.recommendation_interval)
+        ):
+            self.recommendations = self._build_recommendations()
+            self.recommendations_stale = False
+            self.last_recommendation_time = now
+        return self.recommendations
+        
+    def _build_recommendations(self):
+        """Generate detailed recommendations based on current and optimal timings for the intersection"""
+        optimal_times = self.optimal_green_times()
+        differences = optimal_times - self.signal_times
         
         recommendations = []
         
         # Compare current vs optimal timing for each direction
-        for direction in self.directions:
-            current_time = self.current_signal_times[direction]
-            optimal_time = optimal_times[direction]
-            
-            if abs(current_time - optimal_time) >= 5:  # If difference is significant
-                if current_time < optimal_time:
-                    recommendations.append(
-                        f"Tăng thời gian đèn xanh cho hướng {direction} từ {current_time}s lên {optimal_time}s"
-                    )
-                else:
-                    recommendations.append(
-                        f"Giảm thời gian đèn xanh cho hướng {direction} từ {current_time}s xuống {optimal_time}s"
-                    )
-        
+        for i in np.nonzero(np.abs(differences) >= 5)[0]:  # If difference is significant
+            direction = self.directions[i]
+            current_time = int(self.signal_times[i])
+            optimal_time = int(optimal_times[i])
+            if current_time < optimal_time:
+                recommendations.append(
+                    f"Tăng thời gian đèn xanh cho hướng {direction} từ {current_time}s lên {optimal_time}s"
+                )
+            else:
+                recommendations.append(
+                    f"Giảm thời gian đèn xanh cho hướng {direction} từ {current_time}s xuống {optimal_time}s"
+                )
+                
         # Add phase-based insights
-        phase1_density = self.get_phase_density('phase1')
-        phase2_density = self.get_phase_density('phase2')
-        
-        if phase1_density > phase2_density:
-            recommendations.append("Hướng Bắc-Nam có mật độ xe cao hơn - cần tăng thời gian đèn xanh")
-        elif phase2_density > phase1_density:
-            recommendations.append("Hướng Đông-Tây có mật độ xe cao hơn - cần tăng thời gian đèn xanh")
-        else:
+        phase_densities = self.phase_densities()
+        if np.all(phase_densities == phase_densities[0]):
             recommendations.append("Mật độ xe các hướng tương đương - thời gian đèn hiện tại phù hợp")
-        
+        else:
+            busiest_phase = self.phase_names[int(np.argmax(phase_densities))]
+            busiest_names = '-'.join(direction_label(direction) for direction in self.phases[busiest_phase])
+            recommendations.append(f"Hướng {busiest_names} có mật độ xe cao hơn - cần tăng thời gian đèn xanh")
+            
         # Add congestion warnings for each direction
-        for direction in self.directions:
-            if self.is_congested(direction):
-                recommendations.append(f"⚠️ Hướng {direction} đang bị ùn tắc - cần tăng thời gian đèn xanh ngay lập tức")
-        
+        for i in np.nonzero(self.congestion_flags())[0]:
+            recommendations.append(
+                f"⚠️ Hướng {self.directions[i]} đang bị ùn tắc - cần tăng thời gian đèn xanh ngay lập tức"
+            )
+            
         return recommendations if recommendations else ["Thời gian đèn hiện tại đang tối ưu"]
-    
+        
     def get_traffic_status(self):
         """Get current traffic status for display"""
         current_analysis = self.analyze_current_timing()
@@ -154,63 +275,60 @@ class TrafficAnalyzer:
         return {
             'densities': self.traffic_density,
             'vehicle_counts': self.vehicle_counts,
+            'unique_counts': self.unique_counts,
+            'flow_rates': self.flow_rates,
+            'phase_densities': dict(zip(self.phase_names, self.phase_densities().tolist())),
             'current_phase': self.current_phase,
+            'current_phase_index': self.current_phase_index,
             'current_directions': current_analysis['current_directions'],
             'time_remaining': current_analysis['time_remaining'],
             'current_phase_time': current_analysis['current_phase_time'],
             'elapsed_time': current_analysis['elapsed_time']
         }
-    
+        
     def get_remaining_time(self):
         """Calculate remaining time for current signal"""
         current_analysis = self.analyze_current_timing()
         return current_analysis['time_remaining']
-    
+        
     def update_traffic_light(self):
         """Track traffic light changes (for analysis purposes)"""
-        current_time = time.time()
+        current_time = self.clock.now()
         elapsed_time = current_time - self.last_signal_change
         
-        current_phase_directions = self.phases[self.current_phase]
-        current_phase_time = max(
-            self.timing_analysis[direction]['green_time'] + self.timing_analysis[direction]['yellow_time']
-            for direction in current_phase_directions
-        )
-        
-        if elapsed_time >= current_phase_time:
+        if elapsed_time >= self._phase_time(self.current_phase_index):
             # Switch to next phase
-            if self.current_phase == 'phase1':
-                self.current_phase = 'phase2'
-            else:
-                self.current_phase = 'phase1'
+            self.current_phase_index = (self.current_phase_index + 1) % len(self.phase_names)
             self.last_signal_change = current_time
+            self._invalidate()
             return True
             
         return False
-    
+        
     def get_timing_comparison(self):
         """Get comparison between current and suggested timing"""
-        optimal_times = self.calculate_optimal_timing()
+        return self._cached('timing_comparison', self._compute_timing_comparison)
+        
+    def _compute_timing_comparison(self):
+        """Current, suggested and difference of green times per approach"""
+        optimal_times = self.optimal_green_times()
         
         return {
             'current': self.current_signal_times,
-            'suggested': optimal_times,
-            'differences': {
-                direction: optimal_times[direction] - self.current_signal_times[direction]
-                for direction in self.directions
-            }
+            'suggested': self._as_dict(optimal_times),
+            'differences': self._as_dict(optimal_times - self.signal_times)
         }
-    
+        
     def get_intersection_summary(self):
         """Get summary of intersection traffic status"""
-        total_vehicles = sum(self.vehicle_counts.values())
-        total_density = sum(self.traffic_density.values())
-        congested_directions = [direction for direction in self.directions if self.is_congested(direction)]
+        return self._cached('intersection_summary', self._compute_intersection_summary)
         
+    def _compute_intersection_summary(self):
+        """Totals, congested approaches and busiest/least busy approach"""
         return {
-            'total_vehicles': total_vehicles,
-            'total_density': total_density,
-            'congested_directions': congested_directions,
-            'busiest_direction': max(self.directions, key=lambda d: self.traffic_density[d]),
-            'least_busy_direction': min(self.directions, key=lambda d: self.traffic_density[d])
+            'total_vehicles': int(self.counts.sum()),
+            'total_density': float(self.densities.sum()),
+            'congested_directions': [self.directions[i] for i in np.nonzero(self.congestion_flags())[0]],
+            'busiest_direction': self.directions[int(np.argmax(self.densities))],
+            'least_busy_direction': self.directions[int(np.argmin(self.densities))]
         }
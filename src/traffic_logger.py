@@ -1,155 +1,325 @@
 import logging
-import pandas as pd
-from datetime import datetime
+import numpy as np
 import os
 import json
+import time
+from traffic_analyzer import direction_label
+from stats_buffer import ColumnarStatsBuffer, ChunkedStatsWriter
+from running_stats import RunningAggregates
+from structured_log import AsyncLogHandler, JsonLinesFormatter, TextFormatter
+from stage_timer import format_stage_summary
+from clock import WallClock
+
+def render_status_text(fields):
+    """Vietnamese text lines of a traffic status event"""
+    directions = list(fields['densities'].keys())
+    lines = [f"=== PHÂN TÍCH NGÃ {len(directions)} GIAO THÔNG - {fields['timestamp']} ==="]
+    for d in directions:
+        lines.append(f"Hướng {direction_label(d)}: {fields['vehicle_counts'][d]} xe (mật độ: {fields['densities'][d]:.3f})")
+    for d, flow_rate in fields['flow_rates'].items():
+        lines.append(f"Lưu lượng hướng {d}: {flow_rate:.1f} xe/phút (tổng {fields['unique_counts'][d]} xe đã đi qua)")
+    lines.append(f"Pha hiện tại: {fields['current_phase']} ({'-'.join(fields['current_directions'])})")
+    lines.append(f"Thời gian còn lại: {int(fields['time_remaining'])}s")
+    lines.append(f"Thời gian pha hiện tại: {fields['current_phase_time']}s")
+    lines.append(f"Thời gian đã trôi: {fields['elapsed_time']:.1f}s")
+    return lines
+
+def render_recommendations_text(recommendations):
+    """Vietnamese text lines of timing recommendations"""
+    return ["=== GỢI Ý ĐIỀU CHỈNH THỜI GIAN ĐÈN ==="] + [f"• {rec}" for rec in recommendations] + ["=" * 50]
+
+def render_timing_text(fields):
+    """Vietnamese text lines of a current vs. suggested timing comparison"""
+    lines = ["=== PHÂN TÍCH THỜI GIAN ĐÈN ===", "Thời gian hiện tại:"]
+    lines += [f"  - Hướng {direction_label(d)}: {value}s" for d, value in fields['current'].items()]
+    lines.append("Thời gian gợi ý:")
+    lines += [f"  - Hướng {direction_label(d)}: {value}s" for d, value in fields['suggested'].items()]
+    lines.append("Chênh lệch:")
+    lines += [f"  - Hướng {direction_label(d)}: {value:+d}s" for d, value in fields['differences'].items()]
+    return lines
+
+def render_performance_text(fields):
+    """Vietnamese text lines of detection throughput and decoder counters"""
+    lines = ["=== HIỆU NĂNG PHÁT HIỆN XE ==="]
+    for direction, stats in fields['detection'].items():
+        lines.append(
+            f"  - Hướng {direction}: {stats['fps']:.1f} khung hình/giây "
+            f"({stats['avg_latency_ms']:.1f} ms/khung, {stats['frames']} khung, "
+            f"bỏ qua {stats['skipped']} khung không chuyển động)"
+        )
+    for direction, stats in (fields.get('decoder') or {}).items():
+        lines.append(
+            f"  - Giải mã hướng {direction}: {stats['decoded']} khung, "
+            f"bỏ {stats['dropped']}, trễ {stats['late']}, đệm {stats['buffered']}"
+        )
+    return lines
+
+def render_event_text(event, fields):
+    """Render a structured log event as the Vietnamese text log lines"""
+    if event == 'status':
+        return render_status_text(fields)
+    if event == 'recommendations':
+        return render_recommendations_text(fields['recommendations'])
+    if event == 'timing':
+        return render_timing_text(fields)
+    if event == 'performance':
+        return render_performance_text(fields)
+    if event == 'stages':
+        return [f"Thời gian các bước p50/p95/p99 (ms): {format_stage_summary(fields['stages'])}"]
+    if event == 'tick':
+        lines = render_status_text(fields['status'])
+        lines += render_recommendations_text(fields['recommendations'])
+        lines += render_timing_text(fields['timing'])
+        if fields.get('performance'):
+            lines += render_performance_text(fields['performance'])
+        return lines
+    return [f"{event}: {fields}"]
 
 class TrafficLogger:
-    def __init__(self, config_file='config.json'):
+    def __init__(self, config_file='config.json', clock=None):
         # Load configuration
         with open(config_file, 'r') as f:
             self.config = json.load(f)
+            
+        # Statistics rows are stamped with this clock (video time when replaying recordings)
+        self.clock = clock or WallClock()
         
-        # Set up logging
+        # Set up logging (one logger per log file, so several intersections can run in one process)
+        logging_config = self.config['logging']
+        log_file = logging_config['log_file']
+        self.log = logging.getLogger(f"traffic_logger:{os.path.abspath(log_file)}")
+        self.log_handler = None
+        if logging_config['enabled']:
+            if not self.log.handlers:
+                self.log.addHandler(self._create_log_handler(log_file))
+                self.log.setLevel(logging.INFO)
+                self.log.propagate = False
+            self.log_handler = self.log.handlers[0]
+            if isinstance(self.log_handler, AsyncLogHandler):
+                self.log_handler.users += 1
+                
+                
+        # Statistics are kept in a fixed-size columnar buffer and flushed to disk in chunks,
+        # so memory use stays flat however long the process runs
+        self.stats = None
+        self.writer = None
+        self.last_flush_time = time.monotonic()
+        
+        # Running aggregates for reports, so a report never rescans the history
+        self.aggregates = None
+        
+    def _create_log_handler(self, log_file):
+        """File handler with the configured format, written from a background thread when async"""
+        logging_config = self.config['logging']
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        if logging_config.get('format', 'jsonl') == 'text':
+            file_handler.setFormatter(TextFormatter(render_event_text))
+        else:
+            file_handler.setFormatter(JsonLinesFormatter())
+            
+        if not logging_config.get('async', True):
+            return file_handler
+        return AsyncLogHandler(file_handler, logging_config.get('queue_size', 1000))
+        
+    def _emit(self, event, fields):
+        """Log one structured event; rendering and file I/O happen in the log handler"""
         if self.config['logging']['enabled']:
-            logging.basicConfig(
-                filename=self.config['logging']['log_file'],
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - %(message)s'
-            )
+            self.log.info(event, extra={'event': event, 'fields': fields})
+            
+    def get_log_stats(self):
+        """Counters of the asynchronous log queue (records queued, dropped and pending)"""
+        if isinstance(self.log_handler, AsyncLogHandler):
+            return self.log_handler.get_stats()
+        return {'enqueued': 0, 'dropped': 0, 'pending': 0}
         
-        # Initialize statistics storage
-        self.stats = []
+    def _statistics_columns(self, directions):
+        """Column names and dtypes of a statistics record"""
+        columns = {'timestamp': 'datetime64[us]'}
+        columns.update({f'{d}_density': np.float64 for d in directions})
+        columns.update({f'{d}_vehicles': np.int64 for d in directions})
+        columns.update({f'{d}_unique': np.int64 for d in directions})
+        columns.update({f'{d}_flow': np.float64 for d in directions})
+        columns.update({
+            'current_phase': object,
+            'current_directions': object,
+            'time_remaining': np.float64,
+            'current_phase_time': np.int64,
+            'elapsed_time': np.float64
+        })
+        return columns
         
-    def log_traffic_status(self, status):
-        """Log traffic status and statistics for 4-way intersection"""
-        timestamp = datetime.now()
+    def _record_status(self, status):
+        """Add a status to the statistics and report aggregates, and return its log fields"""
+        timestamp = self.clock.datetime()
+        directions = list(status['densities'].keys())
+        unique_counts = status.get('unique_counts', {})
+        flow_rates = status.get('flow_rates', {})
         
-        # Create statistics record for 4 directions
-        record = {
-            'timestamp': timestamp,
-            'north_density': status['densities']['north'],
-            'south_density': status['densities']['south'],
-            'east_density': status['densities']['east'],
-            'west_density': status['densities']['west'],
-            'north_vehicles': status['vehicle_counts']['north'],
-            'south_vehicles': status['vehicle_counts']['south'],
-            'east_vehicles': status['vehicle_counts']['east'],
-            'west_vehicles': status['vehicle_counts']['west'],
+        # Create statistics record with per-approach columns
+        record = {'timestamp': timestamp}
+        record.update({f'{d}_density': status['densities'][d] for d in directions})
+        record.update({f'{d}_vehicles': status['vehicle_counts'][d] for d in directions})
+        record.update({f'{d}_unique': unique_counts.get(d, 0) for d in directions})
+        record.update({f'{d}_flow': flow_rates.get(d, 0.0) for d in directions})
+        record.update({
             'current_phase': status['current_phase'],
             'current_directions': '-'.join(status['current_directions']),
             'time_remaining': status['time_remaining'],
             'current_phase_time': status.get('current_phase_time', 0),
             'elapsed_time': status.get('elapsed_time', 0)
-        }
+        })
+        
+        # Update the report aggregates
+        if self.aggregates is None:
+            self.aggregates = RunningAggregates(directions)
+        self.aggregates.update(
+            timestamp,
+            [status['densities'][d] for d in directions],
+            [status['vehicle_counts'][d] for d in directions],
+            status['current_phase'],
+            status.get('current_phase_time', 0)
+        )
         
-        # Add to statistics
+        # Add to statistics, flushing full or stale chunks to disk
+        if self.stats is None:
+            self.stats = ColumnarStatsBuffer(
+                self._statistics_columns(directions), self.config['logging'].get('flush_rows', 1000)
+            )
         self.stats.append(record)
+        flush_interval = self.config['logging'].get('flush_interval', 60)
+        if self.stats.is_full() or time.monotonic() - self.last_flush_time >= flush_interval:
+            self.flush_statistics()
+            
+        return {
+            'timestamp': timestamp,
+            'densities': status['densities'],
+            'vehicle_counts': status['vehicle_counts'],
+            'unique_counts': unique_counts,
+            'flow_rates': flow_rates,
+            'current_phase': status['current_phase'],
+            'current_directions': list(status['current_directions']),
+            'time_remaining': status['time_remaining'],
+            'current_phase_time': status.get('current_phase_time', 0),
+            'elapsed_time': status.get('elapsed_time', 0)
+        }
+        
+    def log_traffic_status(self, status):
+        """Log traffic status and statistics for every approach of the intersection"""
+        self._emit('status', self._record_status(status))
         
-        # Log to file if enabled
-        if self.config['logging']['enabled']:
-            logging.info(f"=== PHÂN TÍCH NGÃ 4 GIAO THÔNG - {timestamp} ===")
-            logging.info(f"Hướng Bắc: {status['vehicle_counts']['north']} xe (mật độ: {status['densities']['north']:.3f})")
-            logging.info(f"Hướng Nam: {status['vehicle_counts']['south']} xe (mật độ: {status['densities']['south']:.3f})")
-            logging.info(f"Hướng Đông: {status['vehicle_counts']['east']} xe (mật độ: {status['densities']['east']:.3f})")
-            logging.info(f"Hướng Tây: {status['vehicle_counts']['west']} xe (mật độ: {status['densities']['west']:.3f})")
-            logging.info(f"Pha hiện tại: {status['current_phase']} ({'-'.join(status['current_directions'])})")
-            logging.info(f"Thời gian còn lại: {int(status['time_remaining'])}s")
-            logging.info(f"Thời gian pha hiện tại: {status.get('current_phase_time', 0)}s")
-            logging.info(f"Thời gian đã trôi: {status.get('elapsed_time', 0):.1f}s")
-    
     def log_recommendation(self, recommendations):
         """Log timing recommendations"""
-        if self.config['logging']['enabled']:
-            logging.info("=== GỢI Ý ĐIỀU CHỈNH THỜI GIAN ĐÈN NGÃ 4 ===")
-            for rec in recommendations:
-                logging.info(f"• {rec}")
-            logging.info("=" * 50)
-    
+        self._emit('recommendations', {'recommendations': list(recommendations)})
+        
     def log_timing_analysis(self, timing_comparison):
-        """Log timing analysis comparison for 4-way intersection"""
-        if self.config['logging']['enabled']:
-            logging.info("=== PHÂN TÍCH THỜI GIAN ĐÈN NGÃ 4 ===")
-            logging.info(f"Thời gian hiện tại:")
-            logging.info(f"  - Hướng Bắc: {timing_comparison['current']['north']}s")
-            logging.info(f"  - Hướng Nam: {timing_comparison['current']['south']}s")
-            logging.info(f"  - Hướng Đông: {timing_comparison['current']['east']}s")
-            logging.info(f"  - Hướng Tây: {timing_comparison['current']['west']}s")
-            logging.info(f"Thời gian gợi ý:")
-            logging.info(f"  - Hướng Bắc: {timing_comparison['suggested']['north']}s")
-            logging.info(f"  - Hướng Nam: {timing_comparison['suggested']['south']}s")
-            logging.info(f"  - Hướng Đông: {timing_comparison['suggested']['east']}s")
-            logging.info(f"  - Hướng Tây: {timing_comparison['suggested']['west']}s")
-            logging.info(f"Chênh lệch:")
-            logging.info(f"  - Hướng Bắc: {timing_comparison['differences']['north']:+d}s")
-            logging.info(f"  - Hướng Nam: {timing_comparison['differences']['south']:+d}s")
-            logging.info(f"  - Hướng Đông: {timing_comparison['differences']['east']:+d}s")
-            logging.info(f"  - Hướng Tây: {timing_comparison['differences']['west']:+d}s")
-    
+        """Log timing analysis comparison for every approach"""
+        self._emit('timing', timing_comparison)
+        
+    def log_performance(self, detection_stats, decoder_stats=None):
+        """Log per-direction detection throughput and decoder counters"""
+        self._emit('performance', {'detection': detection_stats, 'decoder': decoder_stats or {}})
+        
+    def log_stage_timings(self, stage_summary):
+        """Log the per-stage timing percentiles"""
+        self._emit('stages', {'stages': stage_summary})
+        
+    def log_tick(self, status, recommendations, timing_comparison, detection_stats=None, decoder_stats=None):
+        """Record the status and log everything about one analysis tick as a single event"""
+        fields = {
+            'status': self._record_status(status),
+            'recommendations': list(recommendations),
+            'timing': timing_comparison
+        }
+        if detection_stats is not None:
+            fields['performance'] = {'detection': detection_stats, 'decoder': decoder_stats or {}}
+        self._emit('tick', fields)
+        
+    def _get_writer(self):
+        """Create the statistics writer on first use, so command-line overrides of the config apply"""
+        if self.writer is None:
+            logging_config = self.config['logging']
+            file_format = logging_config.get('statistics_format', 'csv')
+            self.writer = ChunkedStatsWriter(
+                logging_config['statistics_file'], file_format, logging_config.get('rotate_daily', True)
+            )
+            if self.writer.file_format != file_format and logging_config['enabled']:
+                self.log.warning(f"Không có pyarrow, thống kê được lưu dạng CSV thay vì {file_format}")
+        return self.writer
+        
+    def flush_statistics(self):
+        """Write buffered statistics to disk and empty the buffer"""
+        self.last_flush_time = time.monotonic()
+        if self.stats is None or len(self.stats) == 0:
+            return
+        if self.config['logging']['save_statistics']:
+            self._get_writer().write(self.stats.to_frame())
+        self.stats.clear()
+        
     def save_statistics(self):
-        """Save collected statistics to CSV file"""
-        if self.config['logging']['save_statistics'] and self.stats:
-            df = pd.DataFrame(self.stats)
-            df.to_csv(self.config['logging']['statistics_file'], index=False)
-            if self.config['logging']['enabled']:
-                logging.info(f"Thống kê đã được lưu vào {self.config['logging']['statistics_file']}")
-    
+        """Flush the remaining statistics and close the statistics file"""
+        self.flush_statistics()
+        if self.writer is not None:
+            self.writer.close()
+            if self.config['logging']['enabled'] and self.writer.files:
+                self.log.info(f"Thống kê đã được lưu vào {', '.join(self.writer.files)}")
+                
+    def close(self):
+        """Write out queued log records and release the log file"""
+        handler = self.log_handler
+        self.log_handler = None
+        if isinstance(handler, AsyncLogHandler):
+            handler.users -= 1
+            if handler.users <= 0:
+                self.log.removeHandler(handler)
+                handler.close()
+                
+    def get_report_data(self):
+        """Running aggregates of everything logged so far, as a dict (cheap enough to poll)"""
+        if self.aggregates is None:
+            return None
+        return self.aggregates.get_summary()
+        
     def generate_report(self):
-        """Generate a summary report from collected statistics for 4-way intersection"""
-        if not self.stats:
+        """Generate a summary report from collected statistics for the intersection"""
+        summary = self.get_report_data()
+        if summary is None:
             return "Không có dữ liệu thống kê"
             
-        df = pd.DataFrame(self.stats)
+        directions = summary['directions']
         
-        report = "BÁO CÁO PHÂN TÍCH NGÃ 4 GIAO THÔNG\n"
+        report = f"BÁO CÁO PHÂN TÍCH NGÃ {len(directions)} GIAO THÔNG\n"
         report += "=" * 50 + "\n"
-        report += f"Thời gian: {df['timestamp'].min()} đến {df['timestamp'].max()}\n\n"
+        report += f"Thời gian: {summary['start']} đến {summary['end']}\n\n"
         
         # Average densities for all directions
         report += "Mật độ giao thông trung bình:\n"
-        report += f"Hướng Bắc: {df['north_density'].mean():.3f}\n"
-        report += f"Hướng Nam: {df['south_density'].mean():.3f}\n"
-        report += f"Hướng Đông: {df['east_density'].mean():.3f}\n"
-        report += f"Hướng Tây: {df['west_density'].mean():.3f}\n\n"
+        for d, stats in directions.items():
+            report += f"Hướng {direction_label(d)}: {stats['density_mean']:.3f} (độ lệch chuẩn: {stats['density_std']:.3f})\n"
+        report += "\n"
         
         # Peak traffic times for all directions
         report += "Thời điểm giao thông cao điểm:\n"
-        peak_north = df.loc[df['north_density'].idxmax()]
-        peak_south = df.loc[df['south_density'].idxmax()]
-        peak_east = df.loc[df['east_density'].idxmax()]
-        peak_west = df.loc[df['west_density'].idxmax()]
-        
-        report += f"Hướng Bắc: {peak_north['timestamp']} (mật độ: {peak_north['north_density']:.3f})\n"
-        report += f"Hướng Nam: {peak_south['timestamp']} (mật độ: {peak_south['south_density']:.3f})\n"
-        report += f"Hướng Đông: {peak_east['timestamp']} (mật độ: {peak_east['east_density']:.3f})\n"
-        report += f"Hướng Tây: {peak_west['timestamp']} (mật độ: {peak_west['west_density']:.3f})\n\n"
+        for d, stats in directions.items():
+            report += f"Hướng {direction_label(d)}: {stats['density_max_time']} (mật độ: {stats['density_max']:.3f})\n"
+        report += "\n"
         
         # Total vehicle counts for all directions
         report += "Tổng số xe:\n"
-        report += f"Hướng Bắc: {df['north_vehicles'].sum()}\n"
-        report += f"Hướng Nam: {df['south_vehicles'].sum()}\n"
-        report += f"Hướng Đông: {df['east_vehicles'].sum()}\n"
-        report += f"Hướng Tây: {df['west_vehicles'].sum()}\n\n"
+        total_vehicles_by_direction = {direction_label(d): stats['total_vehicles'] for d, stats in directions.items()}
+        for name, total in total_vehicles_by_direction.items():
+            report += f"Hướng {name}: {total}\n"
+        report += "\n"
         
         # Traffic light analysis
-        if 'current_phase_time' in df.columns:
-            report += "Phân tích đèn giao thông:\n"
-            report += f"Thời gian pha trung bình: {df['current_phase_time'].mean():.1f}s\n"
-            report += f"Thời gian đèn xanh trung bình: {(df['current_phase_time'].mean() - 3):.1f}s\n"  # Assuming 3s yellow
-            
-            # Phase distribution
-            if 'current_phase' in df.columns:
-                phase_counts = df['current_phase'].value_counts()
-                report += f"Phân bố pha: {dict(phase_counts)}\n"
+        report += "Phân tích đèn giao thông:\n"
+        report += f"Thời gian pha trung bình: {summary['phase_time_mean']:.1f}s\n"
+        yellow_time = self.config['traffic_light'].get('yellow_time', 3)
+        report += f"Thời gian đèn xanh trung bình: {(summary['phase_time_mean'] - yellow_time):.1f}s\n"
         
-        # Direction comparison
-        total_vehicles_by_direction = {
-            'Bắc': df['north_vehicles'].sum(),
-            'Nam': df['south_vehicles'].sum(),
-            'Đông': df['east_vehicles'].sum(),
-            'Tây': df['west_vehicles'].sum()
-        }
+        # Phase distribution
+        report += f"Phân bố pha: {summary['phase_counts']}\n"
         
+        # Direction comparison
         busiest_direction = max(total_vehicles_by_direction, key=total_vehicles_by_direction.get)
         least_busy_direction = min(total_vehicles_by_direction, key=total_vehicles_by_direction.get)
         
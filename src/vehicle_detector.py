@@ -1,58 +1,131 @@
 import cv2
+import json
+import time
+import hashlib
 import numpy as np
+from detector_backends import create_backend
+from motion_gate import MotionGate
+from roi import RegionOfInterest
+from overlay_renderer import OverlayRenderer
 
 class VehicleDetector:
-    def __init__(self):
-        # Load the pre-trained vehicle detection model (using HOG + SVM by default)
-        self.car_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_car.xml')
+    def __init__(self, config_file='config.json', direction=None):
+        # Load configuration
+        with open(config_file, 'r') as f:
+            self.config = json.load(f)
+        self.direction = direction
         
-    def detect_vehicles(self, frame):
-        # Convert frame to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Apply some image processing to improve detection
-        # 1. Gaussian blur to reduce noise
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        
-        # 2. Contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(blur)
-        
-        # Detect vehicles in the frame with optimized parameters
-        vehicles = self.car_cascade.detectMultiScale(
-            enhanced,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30),
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
-        
-        # Filter out false positives based on size constraints
-        filtered_vehicles = []
-        for (x, y, w, h) in vehicles:
-            aspect_ratio = float(w) / h
-            if 0.7 <= aspect_ratio <= 2.0:  # Common aspect ratios for vehicles
-                filtered_vehicles.append((x, y, w, h))
+        # Detection model: a Haar cascade or an ONNX network through OpenCV DNN (detection.backend);
+        # the model itself is loaded once per worker thread and shared
+        detection_config = self.config.get('detection', {})
+        self.backend = create_backend(detection_config)
+        
+        # Only scan the road region, at a bounded resolution
+        self.roi = RegionOfInterest.from_config(self.config, direction)
+        self.detection_width = detection_config.get('detection_width')
+        
+        # Skip detection on frames where nothing moved since the last pass
+        gate_config = detection_config.get('motion_gate', {})
+        self.gate_config = gate_config
+        self.motion_gate = MotionGate.from_config(gate_config, direction) if gate_config.get('enabled', False) else None
+        self.last_vehicles = []
+        self.last_detection_skipped = False
+        
+        # Overlay drawing follows the display flags
+        self.renderer = OverlayRenderer(self.config.get('display', {}))
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        
+        # Seconds spent in each stage of the latest detect_vehicles call
+        self.stage_times = {}
+        
+    def prepare(self, frame):
+        """Crop a frame to the ROI at detection resolution; None when the motion gate skips it.
+        
+        Returns (region, roi_x, roi_y, scale) for the backend and complete().
+        """
+        self.frames_processed += 1
+        self.stage_times = {}
+        start = time.perf_counter()
+        
+        # Crop to the ROI bounding box
+        roi_x, roi_y, roi_w, roi_h = self.roi.bounding_rect(frame.shape)
+        region = frame[roi_y:roi_y + roi_h, roi_x:roi_x + roi_w]
+        
+        if self.motion_gate is not None:
+            should_detect = self.motion_gate.should_detect(region)
+            self.stage_times['motion_gate'] = time.perf_counter() - start
+            start = time.perf_counter()
+            if not should_detect:
+                # Reuse the previous detections for an unchanged scene
+                self.frames_skipped += 1
+                self.last_detection_skipped = True
+                return None
+        self.last_detection_skipped = False
         
+        # Downscale the region to the detection resolution
+        scale = 1.0
+        if self.detection_width and roi_w > self.detection_width:
+            scale = self.detection_width / roi_w
+            region = cv2.resize(region, (self.detection_width, max(1, int(roi_h * scale))),
+                                interpolation=cv2.INTER_AREA)
+        self.stage_times['preprocess'] = time.perf_counter() - start
+        return region, roi_x, roi_y, scale
+        
+    def complete(self, frame_shape, prepared, boxes, backend_times=None):
+        """Map the backend's boxes for a prepared region back to the frame and keep those on the road"""
+        for stage, seconds in (backend_times or {}).items():
+            self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+        start = time.perf_counter()
+        _, roi_x, roi_y, scale = prepared
+        
+        # Map boxes back to frame coordinates
+        boxes = np.round(np.asarray(boxes, dtype=np.float64).reshape(-1, 4) / scale).astype(np.int64)
+        boxes[:, 0] += roi_x
+        boxes[:, 1] += roi_y
+        
+        # Keep vehicles whose center lies on the road polygon
+        centers = boxes[:, :2] + boxes[:, 2:] // 2
+        boxes = boxes[self.roi.contains(centers, frame_shape)]
+        
+        filtered_vehicles = [tuple(int(v) for v in box) for box in boxes]
+        self.last_vehicles = filtered_vehicles
+        self.stage_times['postprocess'] = time.perf_counter() - start
         return filtered_vehicles
         
-    def draw_detections(self, frame, vehicles):
-        # Create a copy of the frame to avoid modifying the original
-        display_frame = frame.copy()
-        
-        # Draw detection boxes and add information
-        for (x, y, w, h) in vehicles:
-            # Draw filled rectangle with transparency
-            overlay = display_frame.copy()
-            cv2.rectangle(overlay, (x, y), (x+w, y+h), (0, 255, 0), -1)
-            display_frame = cv2.addWeighted(overlay, 0.2, display_frame, 0.8, 0)
-            
-            # Draw border
-            cv2.rectangle(display_frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-            
-            # Draw center point
-            center_x = x + w//2
-            center_y = y + h//2
-            cv2.circle(display_frame, (center_x, center_y), 3, (0, 0, 255), -1)
-        
-        return display_frame
+    def detect_vehicles(self, frame):
+        """Detect vehicles in one frame with this detector's backend"""
+        prepared = self.prepare(frame)
+        if prepared is None:
+            return list(self.last_vehicles)
+        boxes, backend_times = self.backend.detect([prepared[0]])
+        return self.complete(frame.shape, prepared, boxes[0], backend_times)
+        
+    def observe(self, frame, vehicles):
+        """Advance the motion gate on a frame whose detections came from elsewhere (the detection cache)"""
+        if self.motion_gate is not None:
+            roi_x, roi_y, roi_w, roi_h = self.roi.bounding_rect(frame.shape)
+            self.motion_gate.should_detect(frame[roi_y:roi_y + roi_h, roi_x:roi_x + roi_w])
+        self.last_vehicles = list(vehicles)
+        
+    def fingerprint(self, frame_width=None):
+        """Hash of everything that decides this detector's output, so cached detections can be reused.
+        
+        frame_width is the width frames were downscaled to before detection (None for source frames).
+        """
+        gate_settings = {}
+        if self.motion_gate is not None:
+            gate_settings = {key: value for key, value in self.gate_config.items() if key != 'directions'}
+            gate_settings.update(self.gate_config.get('directions', {}).get(self.direction, {}))
+        settings = {
+            'backend': self.backend.settings(),
+            'roi': None if self.roi.points is None else self.roi.points.tolist(),
+            'detection_width': self.detection_width,
+            'motion_gate': gate_settings,
+            'frame_width': frame_width
+        }
+        return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+        
+    def draw_detections(self, frame, vehicles, display_size=None):
+        """Draw detection boxes and center points, optionally on a downscaled display frame"""
+        return self.renderer.render(frame, vehicles, display_size)
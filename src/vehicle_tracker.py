@@ -0,0 +1,192 @@
+import time
+from collections import deque
+import numpy as np
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two arrays of (x, y, w, h) boxes"""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+    x1 = np.maximum(a[..., 0], b[..., 0])
+    y1 = np.maximum(a[..., 1], b[..., 1])
+    x2 = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2])
+    y2 = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+def centroid_distance_matrix(boxes_a, boxes_b):
+    """Pairwise distance between the centers of two arrays of (x, y, w, h) boxes"""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    centers_a = a[:, :2] + a[:, 2:] / 2
+    centers_b = b[:, :2] + b[:, 2:] / 2
+    return np.linalg.norm(centers_a[:, None, :] - centers_b[None, :, :], axis=2)
+
+class VehicleTracker:
+    """Track vehicles across frames of one direction and count unique vehicles passing through"""
+
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=50, max_missed=10, min_hits=3,
+                 flow_window=60.0):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.flow_window = flow_window
+
+        # Track state, one row per live track
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4), dtype=np.float64)
+        self.velocities = np.empty((0, 2), dtype=np.float64)
+
+        # Box of each track's latest detection and frames since then, so velocity comes from
+        # measured motion only, however many predicted frames lie between detections
+        self.matched_boxes = np.empty((0, 4), dtype=np.float64)
+        self.frames_since_match = np.empty(0, dtype=np.int64)
+
+        # Frames since the last detection, including the current one
+        self.detection_gap = 1
+        self.hits = np.empty(0, dtype=np.int64)
+        self.missed = np.empty(0, dtype=np.int64)
+        self.ages = np.empty(0, dtype=np.int64)
+
+        self.next_id = 1
+        self.unique_count = 0
+        self.confirmation_times = deque()
+
+    @classmethod
+    def from_config(cls, tracking_config):
+        """Create a tracker from the tracking section of config.json"""
+        settings = {key: value for key, value in tracking_config.items()
+                    if key not in ('enabled', 'detection_interval')}
+        return cls(**settings)
+
+    def predict(self):
+        """Advance all tracks by their velocity and return the boxes of recently matched tracks"""
+        self.boxes[:, :2] += self.velocities
+        self.ages += 1
+        self.frames_since_match += 1
+        self.detection_gap += 1
+        visible = self.boxes[self.missed == 0]
+        return [tuple(int(v) for v in box) for box in np.round(visible)]
+
+    def _associate(self, detections):
+        """Greedily match tracks to detections by IoU, falling back to centroid distance"""
+        if len(self.boxes) == 0 or len(detections) == 0:
+            return []
+
+        iou = iou_matrix(self.boxes, detections)
+        distance = centroid_distance_matrix(self.boxes, detections)
+
+        # Detecting every k frames lets vehicles move k times as far between detections
+        max_distance = max(self.max_centroid_distance * self.detection_gap, 1e-9)
+        valid = (iou >= self.iou_threshold) | (distance <= max_distance)
+
+        # Lower cost is better: overlap first, then closeness of centers
+        cost = (1.0 - iou) + distance / max_distance
+        cost[~valid] = np.inf
+
+        track_indices, detection_indices = np.nonzero(valid)
+        order = np.argsort(cost[track_indices, detection_indices], kind='stable')
+
+        matches = []
+        used_tracks = np.zeros(len(self.boxes), dtype=bool)
+        used_detections = np.zeros(len(detections), dtype=bool)
+        for track_index, detection_index in zip(track_indices[order], detection_indices[order]):
+            if used_tracks[track_index] or used_detections[detection_index]:
+                continue
+            used_tracks[track_index] = True
+            used_detections[detection_index] = True
+            matches.append((track_index, detection_index))
+        return matches
+
+    def update(self, vehicles, timestamp=None):
+        """Update tracks with the detections of a new frame"""
+        timestamp = time.time() if timestamp is None else timestamp
+        detections = np.asarray(vehicles, dtype=np.float64).reshape(-1, 4)
+
+        # Move tracks to where they should be in this frame
+        predicted = self.boxes.copy()
+        predicted[:, :2] += self.velocities
+        self.boxes = predicted
+        self.ages += 1
+        self.frames_since_match += 1
+
+        matches = self._associate(detections)
+        self.detection_gap = 1
+        matched_tracks = np.array([m[0] for m in matches], dtype=np.int64)
+        matched_detections = np.array([m[1] for m in matches], dtype=np.int64)
+
+        # Matched tracks follow their detection
+        if len(matches):
+            previous_hits = self.hits[matched_tracks]
+            new_boxes = detections[matched_detections]
+            frames = self.frames_since_match[matched_tracks, None]
+            movement = (new_boxes[:, :2] - self.matched_boxes[matched_tracks, :2]) / frames
+            self.velocities[matched_tracks] = 0.5 * self.velocities[matched_tracks] + 0.5 * movement
+            self.boxes[matched_tracks] = new_boxes
+            self.matched_boxes[matched_tracks] = new_boxes
+            self.frames_since_match[matched_tracks] = 0
+            self.hits[matched_tracks] += 1
+            self.missed[matched_tracks] = 0
+
+            # Tracks seen often enough count as a unique vehicle, once
+            newly_confirmed = int(np.count_nonzero(
+                (previous_hits < self.min_hits) & (self.hits[matched_tracks] >= self.min_hits)
+            ))
+            self._confirm(newly_confirmed, timestamp)
+
+        # Unmatched tracks are missed this frame
+        unmatched_tracks = np.ones(len(self.boxes), dtype=bool)
+        unmatched_tracks[matched_tracks] = False
+        self.missed[unmatched_tracks] += 1
+
+        # Drop tracks that have been missing for too long
+        keep = self.missed <= self.max_missed
+        self.ids = self.ids[keep]
+        self.boxes = self.boxes[keep]
+        self.velocities = self.velocities[keep]
+        self.matched_boxes = self.matched_boxes[keep]
+        self.frames_since_match = self.frames_since_match[keep]
+        self.hits = self.hits[keep]
+        self.missed = self.missed[keep]
+        self.ages = self.ages[keep]
+
+        # Unmatched detections start new tracks
+        unmatched_detections = np.ones(len(detections), dtype=bool)
+        unmatched_detections[matched_detections] = False
+        new_boxes = detections[unmatched_detections]
+        count = len(new_boxes)
+        if count:
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count)])
+            self.boxes = np.concatenate([self.boxes, new_boxes])
+            self.velocities = np.concatenate([self.velocities, np.zeros((count, 2))])
+            self.matched_boxes = np.concatenate([self.matched_boxes, new_boxes])
+            self.frames_since_match = np.concatenate([self.frames_since_match, np.zeros(count, dtype=np.int64)])
+            self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int64)])
+            self.missed = np.concatenate([self.missed, np.zeros(count, dtype=np.int64)])
+            self.ages = np.concatenate([self.ages, np.zeros(count, dtype=np.int64)])
+            self.next_id += count
+            if self.min_hits <= 1:
+                self._confirm(count, timestamp)
+
+        return self.get_tracks()
+
+    def _confirm(self, count, timestamp):
+        """Record newly confirmed vehicles"""
+        self.unique_count += count
+        self.confirmation_times.extend([timestamp] * count)
+
+    def get_tracks(self):
+        """Get (track_id, (x, y, w, h)) for tracks matched in the latest frame"""
+        visible = np.nonzero(self.missed == 0)[0]
+        return [
+            (int(self.ids[i]), tuple(int(v) for v in np.round(self.boxes[i])))
+            for i in visible
+        ]
+
+    def get_flow_rate(self, timestamp=None):
+        """Vehicles per minute confirmed during the last flow_window seconds"""
+        timestamp = time.time() if timestamp is None else timestamp
+        while self.confirmation_times and self.confirmation_times[0] < timestamp - self.flow_window:
+            self.confirmation_times.popleft()
+        return len(self.confirmation_times) * 60.0 / self.flow_window